@@ -1,6 +1,6 @@
 import pytest
 
-from valasp.domain.primitive_types import Type, Integer, String, Alpha, Any
+from valasp.domain.primitive_types import Type, Integer, String, Alpha, Any, Date
 
 
 def test_type_cannot_be_instantiated():
@@ -28,6 +28,11 @@ def test_any_cannot_be_instantiated():
         Any()
 
 
+def test_date_cannot_be_instantiated():
+    with pytest.raises(TypeError):
+        Date()
+
+
 def test_set_primitives_is_not_accessible():
     with pytest.raises(PermissionError):
         Type.set_primitives({})
@@ -49,6 +54,20 @@ def test_integer_validate():
         String.parse({})
 
 
+def test_date_validate():
+    assert Date.parse('2019-06-25') == (2019, 6, 25)
+    assert Date.parse('2000-02-29') == (2000, 2, 29)
+    assert Date.parse('2004-02-29') == (2004, 2, 29)
+    for value in ['1900-02-29', '2019-02-29', '2019-04-31', '2019-13-01', '2019-00-10', '0000-01-01', '2019-6', 'a-b-c']:
+        with pytest.raises(ValueError):
+            Date.parse(value)
+    with pytest.raises(TypeError):
+        Date.parse(20190625)
+    assert Date.days_in_month(2019, 2) == 28
+    assert Date.days_in_month(2020, 2) == 29
+    assert Date.days_in_month(2020, 12) == 31
+
+
 def test_key_error():
     with pytest.raises(KeyError):
         Type.get_primitive(bool)
@@ -1,10 +1,17 @@
+import contextlib
 import datetime
+import gzip
+import json
+import os
+import time
+
 import pytest
 from clingo import Number, Symbol, Control, Function, Tuple
 from clingo import String as QString
 
-from valasp.core import Context
+from valasp.core import Context, RunState, ContextTemplate
 from valasp.domain.names import PredicateName
+from valasp.domain import primitive_types
 from valasp.domain.primitive_types import Integer, String, Fun, Any, Alpha
 from valasp.domain.raisers import ValAspWarning
 
@@ -36,6 +43,17 @@ def test_make_fun_successor():
     assert successor(99) == 100
 
 
+def test_make_fun_reuses_code_objects():
+    Context.valasp_code_cache_clear()
+    first = Context().valasp_make_fun('filename', 'successor', ['x'], ['return x + 1'])
+    second = Context().valasp_make_fun('filename', 'successor', ['x'], ['return x + 1'])
+    assert first.__code__ is second.__code__
+    assert first.__globals__ is not second.__globals__
+    info = Context.valasp_code_cache_info()
+    assert info.hits == 1
+    assert info.misses == 1
+
+
 def test_make_fun_can_access_symbol_type():
     context = Context()
     is_number = context.valasp_make_fun('filename', 'is_number', ['x'], ['return x.type == clingo.SymbolType.Number'])
@@ -82,6 +100,12 @@ def test_run_solver():
     assert str(context.valasp_run_solver(["hello_world."])) == "[hello_world]"
 
 
+def test_run_solver_with_control_args():
+    context = Context()
+    model = context.valasp_run_solver(["{a(1); a(2)} = 1. #maximize{X : a(X)}."], control_args=['-t', '2', '--opt-mode=opt'])
+    assert str(model) == "[a(2)]"
+
+
 def test_register_term():
     context = Context()
     context.valasp_register_term('filename', PredicateName('successor'), ['x'], ['return x.number + 1'])
@@ -167,13 +191,37 @@ def test_class_checks_must_have_no_arguments():
             raise TypeError()
 
     context = Context()
-    context.valasp_register_class(Foo)
+    with pytest.warns(ValAspWarning):
+        context.valasp_register_class(Foo)
 
     with pytest.raises(TypeError):
         Foo.check_fail(0)
 
-    with pytest.warns(ValAspWarning):
-        context.valasp_run_class_methods()
+    context.valasp_run_class_methods()
+
+
+def test_class_methods_with_custom_prefix():
+    calls = []
+
+    class Foo:
+        @classmethod
+        def custom_foo(cls):
+            calls.append(cls.__name__)
+
+    class Bar:
+        @classmethod
+        def custom_bar(cls, state):
+            calls.append(state)
+
+    context = Context()
+    context.valasp_register_class(Foo)
+    context.valasp_run_class_methods('custom')
+    assert calls == ['Foo']
+
+    context.valasp_register_class(Bar)
+    state = RunState()
+    context.valasp_run_class_methods('custom', state)
+    assert calls == ['Foo', 'Foo', state.of(Bar)]
 
 
 def test_fail_after_grounding():
@@ -244,6 +292,8 @@ def test_define_str_and_cmp():
     assert p12 < p13
     assert p13 > p12
     assert p12 == p12_
+    assert hash(p12) == hash(p12_)
+    assert len({p12, p13, p12_}) == 2
 
 
 def test_int():
@@ -295,6 +345,250 @@ def test_check_method():
         context.valasp_run_solver(["node(11)."])
 
 
+def test_unique():
+    context = Context()
+
+    @context.valasp(unique=['id'])
+    class User:
+        id: Integer
+        bandwidth: Integer
+
+    @context.valasp(unique=['source', 'dest'])
+    class Edge:
+        source: Integer
+        dest: Integer
+        weight: Integer
+
+    model = context.valasp_run_solver(["user(1,10). user(2,10). user(1,10). edge(1,2,5). edge(2,1,5)."])
+    assert str(model) == '[user(1,10), user(2,10), edge(1,2,5), edge(2,1,5)]'
+
+    with pytest.raises(RuntimeError) as error:
+        context.valasp_run_solver(["user(1,10). user(1,20)."])
+    assert 'duplicate key id=1, already used by user(1,' in context.valasp_extract_error_message(error.value)
+
+    with pytest.raises(RuntimeError) as error:
+        context.valasp_run_solver(["edge(1,2,5). edge(1,2,6)."])
+    assert 'duplicate key source=1, dest=2' in context.valasp_extract_error_message(error.value)
+
+
+def test_unique_requires_annotations_and_predicate():
+    context = Context()
+
+    with pytest.raises(ValueError):
+        @context.valasp(unique=['key'])
+        class User:
+            id: Integer
+
+    with pytest.raises(ValueError):
+        @context.valasp(validate_predicate=False, unique=['id'])
+        class Person:
+            id: Integer
+
+
+def test_table():
+    context = Context()
+
+    @context.valasp(table=True)
+    class User:
+        id: Integer
+        name: Alpha
+        mail: String
+        extra: Any
+
+    with pytest.raises(ValueError):
+        context.valasp_table(User)
+
+    context.valasp_run_solver(['user(1,alice,"a@x",1). user(2,bob,"b@x",f(1)).'])
+    table = context.valasp_table(User)
+    assert len(table) == 2
+    assert list(table.column('id')) == [1, 2]
+    assert table.column('name') == ['alice', 'bob']
+    assert table.column('mail') == ['a@x', 'b@x']
+    assert table.column('extra')[0] == 1
+
+    control = Control()
+    control.add("base", [], 'user(3,carol,"c@x",0).')
+    state = context.valasp_run(control)
+    assert isinstance(state, RunState)
+    assert list(context.valasp_table(User, state).column('id')) == [3]
+    assert context.valasp_table(User) is context.valasp_table(User, state)
+
+
+def test_table_requirements():
+    context = Context()
+
+    @context.valasp()
+    class User:
+        id: Integer
+
+    with pytest.raises(ValueError):
+        context.valasp_table(User)
+
+    with pytest.raises(ValueError):
+        @context.valasp(validate_predicate=False, table=True)
+        class Person:
+            id: Integer
+
+
+def test_add_facts():
+    context = Context()
+    ids = []
+
+    @context.valasp(unique=['id'], table=True)
+    class User:
+        id: Integer
+        name: Alpha
+        mail: String
+
+        def __post_init__(self):
+            ids.append(self.id)
+            if self.id <= 0:
+                raise ValueError("invalid id")
+
+    models = []
+    control = Control()
+    control.add("base", [], 'user(3,carol,"c@x"). ok :- user(1,alice,"a@x").')
+    context.valasp_run(control, on_model=lambda m: models.append(str(m)),
+                       facts={User: [(1, 'alice', 'a@x'), Function('user', [Number(2), Function('bob'), QString('b')])]})
+    assert models == ['user(1,alice,"a@x") user(2,bob,"b") user(3,carol,"c@x") ok']
+    assert ids == [1, 2, 3]
+    assert list(context.valasp_table(User).column('id')) == [1, 2, 3]
+
+    models = []
+    context.valasp_run(Control(), on_model=lambda m: models.append(str(m)),
+                       facts={context.valasp_class(PredicateName('user')): [('4', 'dave', 'd')]})
+    assert models == ['user(4,dave,"d")']
+    with pytest.raises(ValueError):
+        context.valasp_class(PredicateName('person'))
+
+    with pytest.raises(ValueError):
+        context.valasp_run(Control(), facts={User: [(0, 'x', 'y')]})
+    with pytest.raises(ValueError):
+        context.valasp_run(Control(), facts={User: [(1, 'x', 'y'), (1, 'z', 'w')]})
+    with pytest.raises(ValueError):
+        context.valasp_run(Control(), facts={User: [(1, 'x')]})
+    with pytest.raises(ValueError):
+        context.valasp_run(Control(), facts={User: [Function('person', [Number(1)])]})
+
+
+def test_add_facts_requires_a_run():
+    context = Context()
+    ids = []
+
+    @context.valasp()
+    class User:
+        id: Integer
+
+        def __post_init__(self):
+            ids.append(self.id)
+
+    control = Control()
+    with pytest.raises(ValueError):
+        context.valasp_add_facts(control, User, [(1,), (2,)])
+    assert ids == []
+
+    context.valasp_run(control, facts={User: [(1,), (2,)]}, with_solve=False)
+    assert ids == [1, 2]
+
+
+def test_add_facts_without_validator():
+    context = Context()
+
+    @context.valasp(validate_predicate=False, with_fun=Fun.TUPLE)
+    class Edge:
+        source: Integer
+        dest: Integer
+
+        def __post_init__(self):
+            if self.source == self.dest:
+                raise ValueError("loop")
+
+    control = Control()
+    control.add("base", [], "reach(X,Y) :- edge(X,Y). reach(X,Z) :- reach(X,Y), edge(Y,Z).")
+    models = []
+    context.valasp_run(control, on_model=lambda m: models.append(str(m)), facts={Edge: [(1, 2), (2, 3)]})
+    assert models == ['edge(1,2) edge(2,3) reach(1,2) reach(2,3) reach(1,3)']
+
+    with pytest.raises(ValueError):
+        context.valasp_run(Control(), facts={Edge: [(1, 1)]})
+
+    class Other:
+        pass
+
+    with pytest.raises(ValueError):
+        context.valasp_add_facts(Control(), Other, [])
+
+
+def test_snapshot(tmp_path):
+    context = Context()
+    ids = []
+
+    @context.valasp()
+    class Node:
+        id: Integer
+
+        def __post_init__(self):
+            ids.append(self.id)
+            if self.id <= 0:
+                raise ValueError("invalid id")
+
+    @context.valasp(unique=['id'])
+    class User:
+        id: Integer
+        name: Alpha
+
+        def __post_init__(self):
+            ids.append(-self.id)
+
+    snapshot = (tmp_path / "instance.snapshot").as_posix()
+    control = Control()
+    control.add("base", [], "node(1..3). user(1,a). other(a). derived(X) :- node(X).")
+    with pytest.warns(ValAspWarning, match='derived/1, other/1 are not validated'):
+        context.valasp_run(control, on_validation_done=lambda: context.valasp_save_snapshot(control, snapshot, 'key'),
+                           with_solve=False)
+    assert sorted(ids) == [-1, 1, 2, 3]
+
+    ids.clear()
+    models = []
+    control = Control()
+    control.add("base", [], "node(4). reach(X) :- node(X).")
+    context.valasp_run(control, on_model=lambda m: models.append(sorted(str(a) for a in m.symbols(atoms=True))),
+                       snapshots=[snapshot], snapshot_key='key')
+    assert ids == [-1, 4]
+    assert 'user(1,a)' in models[0]
+    assert 'other(a)' not in models[0] and 'derived(1)' not in models[0]
+    assert 'reach(1)' in models[0] and 'reach(4)' in models[0]
+
+    control = Control()
+    control.add("base", [], "user(1,a). user(2,b).")
+    context.valasp_run(control, snapshots=[snapshot], snapshot_key='key')
+
+    control = Control()
+    control.add("base", [], "user(1,b).")
+    with pytest.raises(RuntimeError):
+        context.valasp_run(control, snapshots=[snapshot], snapshot_key='key')
+
+    with pytest.raises(ValueError):
+        context.valasp_run(Control(), snapshots=[snapshot], snapshot_key='other')
+
+    with pytest.raises(ValueError):
+        context.valasp_add_snapshot(Control(), snapshot, 'key')
+
+    with gzip.open(tmp_path / "injected.snapshot", 'wt') as f:
+        json.dump({'format': 1, 'key': 'key', 'atoms': ['node(5). #show.'], 'terms': {}}, f)
+    with pytest.raises(ValueError):
+        context.valasp_run(Control(), snapshots=[(tmp_path / "injected.snapshot").as_posix()], snapshot_key='key')
+
+    with gzip.open(tmp_path / "number.snapshot", 'wt') as f:
+        json.dump({'format': 1, 'key': 'key', 'atoms': ['1'], 'terms': {}}, f)
+    with pytest.raises(ValueError):
+        context.valasp_run(Control(), snapshots=[(tmp_path / "number.snapshot").as_posix()], snapshot_key='key')
+
+    (tmp_path / "invalid.snapshot").write_text('node(1).')
+    with pytest.raises(ValueError):
+        context.valasp_run(Control(), snapshots=[(tmp_path / "invalid.snapshot").as_posix()])
+
+
 def test_string():
     context = Context()
 
@@ -426,6 +720,158 @@ def test_any_type():
     Weak(Function('abc', [Number(1)]))
 
 
+def test_date_type():
+    context = Context()
+
+    @context.valasp(validate_predicate=False)
+    class Bday:
+        name: Alpha
+        date: primitive_types.Date
+
+    def bday(year, month, day):
+        return Function('bday', [Function('sofia'), Tuple([Number(year), Number(month), Number(day)])])
+
+    assert Bday(bday(2019, 6, 25)).date == (2019, 6, 25)
+    assert Bday(bday(2020, 2, 29)).date == (2020, 2, 29)
+    assert Bday(bday(2019, 6, 25)) < Bday(bday(2019, 7, 1))
+    for date in [(2019, 2, 29), (1900, 2, 29), (2019, 4, 31), (2019, 0, 1), (2019, 13, 1), (2019, 1, 0), (0, 1, 1)]:
+        with pytest.raises(ValueError):
+            Bday(bday(*date))
+    with pytest.raises(TypeError):
+        Bday(Function('bday', [Function('sofia'), Tuple([Number(2019), Number(6)])]))
+    with pytest.raises(TypeError):
+        Bday(Function('bday', [Function('sofia'), Function('date', [Number(2019), Number(6), Number(25)])]))
+    with pytest.raises(TypeError):
+        Bday(Function('bday', [Function('sofia'), Tuple([Number(2019), QString('6'), Number(25)])]))
+    with pytest.raises(TypeError):
+        Bday(Function('bday', [Function('sofia'), Number(2019)]))
+
+    @context.valasp(validate_predicate=False)
+    class Period:
+        start: primitive_types.Date
+        end: primitive_types.Date
+
+    period = Period(Function('period', [Tuple([Number(2019), Number(6), Number(25)]), Tuple([Number(2020), Number(1), Number(2)])]))
+    assert (period.start, period.end) == ((2019, 6, 25), (2020, 1, 2))
+
+
+@pytest.mark.skipif(not os.environ.get('VALASP_BENCHMARK'), reason='timing benchmark; set VALASP_BENCHMARK=1 to run')
+def test_date_type_benchmark():
+    context = Context()
+
+    @context.valasp(validate_predicate=False, with_fun=Fun.FORWARD)
+    class Primitive:
+        date: primitive_types.Date
+
+    @context.valasp(validate_predicate=False, with_fun=Fun.TUPLE)
+    class WithDatetime:
+        year: Integer
+        month: Integer
+        day: Integer
+
+        def __post_init__(self):
+            datetime.date(self.year, self.month, self.day)
+
+    dates = [Tuple([Number(1900 + i % 200), Number(1 + i % 12), Number(1 + i % 28)]) for i in range(20000)]
+    elapsed = {}
+    for cls in (Primitive, WithDatetime):
+        start = time.perf_counter()
+        for date in dates:
+            cls(date)
+        elapsed[cls] = time.perf_counter() - start
+    # Date used to read the arguments of each term several times, and was about twice as slow as datetime
+    assert elapsed[Primitive] < 1.5 * elapsed[WithDatetime]
+
+
+def test_recursive_type():
+    context = Context()
+
+    @context.valasp(validate_predicate=False)
+    class Cons:
+        head: Integer
+        tail: 'Cons'
+
+        def check_head(self):
+            if self.head <= 0:
+                raise ValueError('head must be positive')
+
+    def cons(*values, nil='nil'):
+        res = Function(nil)
+        for value in reversed(values):
+            res = Function('cons', [Number(value), res])
+        return res
+
+    lst = Cons(cons(1, 2, 3))
+    assert [lst.head, lst.tail.head, lst.tail.tail.head] == [1, 2, 3]
+    assert lst.tail.tail.tail is None
+    assert str(lst) == 'cons(1,cons(2,cons(3,nil)))'
+    assert lst == Cons(cons(1, 2, 3))
+    assert hash(lst) == hash(Cons(cons(1, 2, 3)))
+    assert lst < Cons(cons(2))
+
+    long = Cons(cons(*range(1, 20001)))
+    assert long.tail.head == 2
+    with pytest.raises(ValueError):
+        Cons(cons(*range(1, 10000), 0))
+    with pytest.raises(ValueError):
+        Cons(cons(1, 2, nil='empty'))
+
+
+def test_recursive_type_shares_suffixes():
+    context = Context()
+
+    @context.valasp(validate_predicate=False, with_fun=Fun.TUPLE, nil='empty')
+    class Path:
+        node: Integer
+        rest: 'Path'
+
+    with RunState().activate():
+        suffix = Tuple([Number(2), Tuple([Number(3), Function('empty')])])
+        first = Path(Tuple([Number(1), suffix]))
+        second = Path(Tuple([Number(0), suffix]))
+        assert first.rest is second.rest
+
+
+def test_recursive_type_memo_is_keyed_by_class():
+    def make_cons(positive):
+        context = Context()
+
+        @context.valasp(validate_predicate=False)
+        class Cons:
+            head: Integer
+            tail: 'Cons'
+
+            def check_head(self):
+                if positive and self.head <= 0:
+                    raise ValueError("expecting positive head")
+
+        return Cons
+
+    first, second = make_cons(False), make_cons(True)
+    suffix = Function('cons', [Number(-5), Function('nil')])
+    for state in [None, RunState()]:
+        with state.activate() if state else contextlib.nullcontext():
+            assert isinstance(first(Function('cons', [Number(5), suffix])).tail, first)
+            with pytest.raises(ValueError):
+                second(Function('cons', [Number(1), suffix]))
+            assert isinstance(second(Function('cons', [Number(1), Function('nil')])), second)
+
+
+def test_recursive_type_restrictions():
+    context = Context()
+
+    with pytest.raises(TypeError):
+        @context.valasp()
+        class Tree:
+            left: 'Tree'
+            right: 'Tree'
+
+    with pytest.raises(TypeError):
+        @context.valasp(with_fun=Fun.FORWARD)
+        class Loop:
+            value: 'Loop'
+
+
 def test_class_checks():
     context = Context()
 
@@ -729,3 +1175,230 @@ def test_doc_example():
 
     with pytest.raises(RuntimeError):
         context.valasp_run(Control(), aux_program=['birthday("no one",date(2019,2,29)).'])
+
+
+def test_pure_at_terms_are_memoized():
+    calls = []
+
+    def succ(x):
+        calls.append(x)
+        return x.number + 1
+
+    context = Context()
+    context.valasp_pure(succ)
+    model = context.valasp_run_solver(['a(@succ(1)). b(@succ(1)). c(@succ(2)).'])
+    assert str(model) == '[a(2), b(2), c(3)]'
+    assert len(calls) == 2
+    info = context.valasp_pure_info()['succ']
+    assert info.hits == 1
+    assert info.misses == 2
+
+
+def test_pure_maxsize_must_be_positive():
+    context = Context()
+    with pytest.raises(ValueError):
+        @context.valasp_pure(maxsize=0)
+        def foo(x):
+            return x
+
+
+def test_run_state_is_isolated_between_runs():
+    context = Context()
+
+    @context.valasp()
+    class Node:
+        value: Integer
+
+        def __post_init__(self):
+            self.valasp_state().instances += 1
+
+        @classmethod
+        def before_grounding_init(cls, state):
+            state.instances = 0
+
+        @classmethod
+        def after_grounding_check(cls, state):
+            if state.instances != 2:
+                raise ValueError(f"expecting 2 instances, but found {state.instances}")
+
+    context.valasp_run(Control(), aux_program=['node(1). node(2).'], with_solve=False)
+    context.valasp_run(Control(), aux_program=['node(3). node(4).'], with_solve=False)
+    with pytest.raises(ValueError):
+        context.valasp_run(Control(), aux_program=['node(1).'], with_solve=False)
+
+
+def test_run_state_is_keyed_by_class():
+    def make_user():
+        context = Context()
+
+        @context.valasp()
+        class User:
+            id: Integer
+
+        return User
+
+    first, second = make_user(), make_user()
+    first.valasp_state().seen = True
+    assert not hasattr(first.valasp_state(), 'seen')
+
+    state = RunState()
+    with state.activate():
+        first.valasp_state().seen = True
+        assert first.valasp_state().seen
+        assert not hasattr(second.valasp_state(), 'seen')
+    assert state.of(first) is not state.of(second)
+
+
+def test_run_state_supports_concurrent_runs():
+    from concurrent.futures import ThreadPoolExecutor
+
+    context = Context()
+
+    @context.valasp()
+    class Node:
+        value: Integer
+
+        def __post_init__(self):
+            self.valasp_state().sum += self.value
+
+        @classmethod
+        def before_grounding_init(cls, state):
+            state.sum = 0
+
+    def run(n):
+        res = {}
+        context.valasp_run(Control(), aux_program=[f'node(1..{n}).'], with_solve=False,
+                           on_validation_done=lambda: res.update(sum=RunState.current().of(Node).sum))
+        return res['sum']
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        sums = list(executor.map(run, range(1, 50)))
+    assert sums == [n * (n + 1) // 2 for n in range(1, 50)]
+
+
+def test_context_template_builds_once():
+    builds = []
+
+    def build(context):
+        builds.append(context)
+
+        @context.valasp()
+        class Node:
+            value: Integer
+
+    template = ContextTemplate(build, max_arity=4)
+    first = template.instantiate()
+    second = template.instantiate()
+    assert len(builds) == 1
+    assert first is not second
+
+    assert str(first.valasp_run_solver(['node(1).'])) == '[node(1)]'
+    with pytest.raises(RuntimeError):
+        second.valasp_run_solver(['node(a).'])
+
+    first.valasp_register_term('filename', PredicateName('succ'), ['x'], ['return x.number + 1'])
+    assert str(first.valasp_run_solver(['node(@succ(1)).'])) == '[node(2)]'
+    with pytest.raises(RuntimeError):
+        second.valasp_run_solver(['node(@succ(1)).'])
+
+
+def test_lazy_context_grounds_only_occurring_validators():
+    context = Context(lazy=True)
+
+    @context.valasp()
+    class Node:
+        value: Integer
+
+    @context.valasp()
+    class Edge:
+        source: Integer
+        dest: Integer
+
+    assert 'valasp_validate_node' not in context.__dict__
+    assert str(context.valasp_run_solver(['node(1).'])) == '[node(1)]'
+    assert 'valasp_validate_node' in context.__dict__
+    assert 'valasp_validate_edge' not in context.__dict__
+
+    with pytest.raises(RuntimeError):
+        context.valasp_run_solver(['node(a).'])
+    with pytest.raises(RuntimeError):
+        context.valasp_run_solver(['node(1). node(1,2).'])
+
+    res = None
+
+    def on_model(model):
+        nonlocal res
+        res = [str(atom) for atom in model.symbols(atoms=True)]
+
+    context.valasp_run(Control(), on_model=on_model, aux_program=['edge(1,2).'])
+    assert res == ['edge(1,2)']
+    with pytest.raises(RuntimeError):
+        context.valasp_run(Control(), aux_program=['edge(1,a).'])
+
+
+def test_validators_for_signatures():
+    context = Context(max_arity=2)
+
+    @context.valasp()
+    class Node:
+        value: Integer
+
+    assert context.valasp_validators(set()) == ''
+    assert context.valasp_validators({('node', 1)}) == ':- node(X0); @valasp_validate_node(X0) != 1.'
+    assert context.valasp_validators({('node', 2)}) == \
+        ':- node(X0,X1); @valasp_error("node/2 is blacklisted", (X0,X1,)) == 1.'
+    assert 'node(X0,X1) :- node(X0,X1).' in context.valasp_validators()
+
+
+def test_print_model_in_chunks():
+    class Stream:
+        def __init__(self):
+            self.chunks = []
+
+        def write(self, chunk):
+            self.chunks.append(chunk)
+
+    control = Control()
+    control.add("base", [], "a(1..100). #show a/1.")
+    control.ground([("base", [])])
+    stream = Stream()
+    control.solve(on_model=lambda m: Context.valasp_print_model(m, stream, buffer_size=64))
+    assert len(stream.chunks) > 1
+    assert ''.join(stream.chunks) == 'Answer: ' + ' '.join(f'a({i})' for i in range(1, 101)) + '\n'
+
+
+def test_output_validator_checks_only_new_atoms():
+    context = Context()
+
+    @context.valasp(validate_predicate=False)
+    class Pick:
+        value: Integer
+
+        def __post_init__(self):
+            if self.value > 3:
+                raise ValueError("too large")
+
+    @context.valasp()
+    class Item:
+        value: Integer
+
+    validator = context.valasp_output_validator([PredicateName('pick'), PredicateName('item')])
+    models = []
+
+    def on_model(model):
+        models.append(str(model))
+
+    control = Control(['-n', '0'])
+    control.add("base", [], "item(1..3). {pick(X) : item(X)} = 1.")
+    context.valasp_run(control, on_model=on_model, output_validator=validator)
+    assert len(models) == 3
+    assert validator.seen() == 6
+
+    control = Control(['-n', '0'])
+    control.add("base", [], "item(1..3). {pick(X) : item(X)} = 1. pick(4) :- pick(3).")
+    with pytest.raises(ValueError) as error:
+        context.valasp_run(control, output_validator=context.valasp_output_validator())
+    assert 'invalid output' in str(error.value)
+
+    with pytest.raises(ValueError):
+        context.valasp_output_validator([PredicateName('unknown')])
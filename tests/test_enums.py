@@ -0,0 +1,30 @@
+import pytest
+
+from valasp.enums import load_enum, clear_cache
+
+
+def test_load_enum(tmp_path):
+    codes = tmp_path / 'codes.txt'
+    codes.write_text('P001\nP002\n\nP003\n')
+    ids = tmp_path / 'ids.txt'
+    ids.write_text('10\n 20 \n\n')
+    assert load_enum(codes.as_posix(), 'String') == {'P001', 'P002', 'P003'}
+    assert load_enum(codes.as_posix(), 'Alpha') == {'P001', 'P002', 'P003'}
+    assert load_enum(ids.as_posix(), 'Integer') == {10, 20}
+
+
+def test_load_enum_is_shared(tmp_path):
+    codes = tmp_path / 'codes.txt'
+    codes.write_text('a\nb\n')
+    first = load_enum(codes.as_posix(), 'Alpha')
+    codes.write_text('c\n')
+    assert load_enum(codes.as_posix(), 'Alpha') is first
+    clear_cache()
+    assert load_enum(codes.as_posix(), 'Alpha') == {'c'}
+
+
+def test_load_enum_invalid_integer(tmp_path):
+    ids = tmp_path / 'ids.txt'
+    ids.write_text('10\nabc\n')
+    with pytest.raises(ValueError):
+        load_enum(ids.as_posix(), 'Integer')
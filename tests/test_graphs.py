@@ -0,0 +1,26 @@
+from valasp.graphs import adjacency, find_cycle, find_disconnected
+
+
+def test_adjacency():
+    assert adjacency([(1, 2), (1, 3), (3, 1)]) == {1: [2, 3], 2: [], 3: [1]}
+
+
+def test_find_cycle():
+    assert find_cycle([]) is None
+    assert find_cycle([(1, 2), (2, 3), (1, 3)]) is None
+    assert find_cycle([(1, 1)]) == [1, 1]
+    assert find_cycle([(0, 1), (1, 2), (2, 3), (3, 1)]) == [1, 2, 3, 1]
+    assert find_cycle([('a', 'b'), ('c', 'd'), ('d', 'c')]) == ['c', 'd', 'c']
+
+
+def test_find_cycle_on_long_paths():
+    n = 100000
+    assert find_cycle((i, i + 1) for i in range(n)) is None
+    assert len(find_cycle([(i, i + 1) for i in range(n)] + [(n, 0)])) == n + 2
+
+
+def test_find_disconnected():
+    assert find_disconnected([]) is None
+    assert find_disconnected([(1, 2), (3, 2), (3, 4)]) is None
+    assert find_disconnected([(1, 2), (3, 4)]) == (1, 3)
+    assert find_disconnected([(1, 2), (3, 4), (4, 1)]) is None
@@ -0,0 +1,65 @@
+import bz2
+import gzip
+import io
+import lzma
+
+import pytest
+from clingo import Control
+
+from valasp.core import Context
+from valasp.loaders import split_statements, is_compressed
+
+
+def test_split_statements():
+    program = 'a(1).\nb(X) :-\n  a(X).\nc("x.\n'.splitlines(keepends=True)
+    assert list(split_statements(program, 1)) == ['a(1).\n', 'b(X) :-\n  a(X).\n', 'c("x.\n']
+
+    program = ['a(1..\n', '3).\n', 'b. % c.\n', 'd :- % e.\n', 'b.\n']
+    assert list(split_statements(program, 1)) == ['a(1..\n3).\n', 'b. % c.\n', 'd :- % e.\nb.\n']
+
+    program = ['a. %* x.\n', 'y. *%\n', 'b("%.\\"").\n', 'c("a.") :-\n', 'b(_).\n']
+    assert list(split_statements(program, 1)) == ['a. %* x.\ny. *%\n', 'b("%.\\"").\n', 'c("a.") :-\nb(_).\n']
+
+    program = ['a.\n', '#program p.\n', 'b.\n', 'c.\n']
+    assert list(split_statements(program, 1)) == ['a.\n', '#program p.\nb.\nc.\n']
+
+    program = [f'a({i}).\n' for i in range(100)]
+    chunks = list(split_statements(program, 50))
+    assert len(chunks) > 1
+    assert ''.join(chunks) == ''.join(program)
+
+
+@pytest.mark.parametrize("extension, opener", [('.gz', gzip.open), ('.bz2', bz2.open), ('.xz', lzma.open)])
+def test_load_compressed(tmp_path, extension, opener):
+    filename = (tmp_path / f"input.lp{extension}").as_posix()
+    assert is_compressed(filename)
+    with opener(filename, 'wt') as f:
+        f.write('#const n=50.\n')
+        f.write(''.join(f'a({i}).\n' for i in range(1, 101)))
+        f.write('b(X) :- a(X), X <= n.\n')
+
+    context = Context()
+    control = Control()
+    context.valasp_load(control, filename, chunk_size=64)
+    control.ground([("base", [])])
+    assert len(list(control.symbolic_atoms.by_signature('b', 1))) == 50
+
+
+def test_load_plain(tmp_path):
+    filename = tmp_path / "input.lp"
+    filename.write_text('a(1).')
+    assert not is_compressed(filename.as_posix())
+
+    control = Control()
+    Context.valasp_load(control, filename.as_posix())
+    control.ground([("base", [])])
+    assert len(list(control.symbolic_atoms.by_signature('a', 1))) == 1
+
+
+def test_load_stdin(monkeypatch):
+    monkeypatch.setattr('sys.stdin', io.StringIO(''.join(f'a({i}).\n' for i in range(100)) + 'b :- a(99).\n'))
+    control = Control()
+    Context.valasp_load(control, '-', chunk_size=32)
+    control.ground([("base", [])])
+    assert len(list(control.symbolic_atoms.by_signature('a', 1))) == 100
+    assert len(list(control.symbolic_atoms.by_signature('b', 0))) == 1
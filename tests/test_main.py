@@ -1,14 +1,22 @@
+import gzip
+import io
+import os
+import subprocess
+import sys
 from typing import List, Tuple
 
 import pytest
 
+from valasp.enums import clear_cache
+import valasp.main
 from valasp.main import main
 
 
 def call_main(tmp_path, args: List[str]) -> Tuple[str, str]:
     stdout = tmp_path / "out"
     stderr = tmp_path / "err"
-    main(args, stdout=stdout.open('w'), stderr=stderr.open('w'))
+    with stdout.open('w') as out, stderr.open('w') as err:
+        main(args, stdout=out, stderr=err)
     return stdout.read_text(), stderr.read_text()
 
 
@@ -81,6 +89,363 @@ bday:
     assert not err
 
 
+def test_date(tmp_path):
+    yaml = """
+bday:
+    name: Alpha
+    date:
+        type: Date
+        min: 2000-01-01
+        max: '2019-12-31'
+    """
+
+    out, err = call_main_on_yaml_and_asp(tmp_path, yaml, "bday(sofia, (2019,6,25)). bday(leonardo, (2016,2,29)).")
+    assert 'ALL VALID!' in out
+    assert not err
+
+    out, err = call_main_on_yaml_and_asp(tmp_path, yaml, "bday(sofia, (2019,2,29)).")
+    assert 'invalid date (2019,2,29)' in out
+
+    out, err = call_main_on_yaml_and_asp(tmp_path, yaml, "bday(sofia, (2020,6,25)).")
+    assert 'Should be <= (2019, 12, 31)' in out
+
+    out, err = call_main_on_yaml_and_asp(tmp_path, yaml, "bday(sofia, (1999,6,25)).")
+    assert 'Should be >= (2000, 1, 1)' in out
+
+
+def test_references(tmp_path):
+    yaml = """
+valasp:
+    asp: |+
+        user(1,alice). user(2,bob).
+user:
+    id: Integer
+    name: Alpha
+assign:
+    user:
+        type: Integer
+        references: {predicate: user, term: id}
+    task: Integer
+    """
+    out, err = call_main_on_yaml_and_asp(tmp_path, yaml, "assign(1,10). assign(2,20).")
+    assert 'ALL VALID!' in out
+    assert not err
+
+    out, err = call_main_on_yaml_and_asp(tmp_path, yaml, "assign(1,10). assign(3,20). assign(4,30).")
+    assert 'user in predicate assign references 2 undefined id of user: 3, 4' in out
+    assert not err
+
+
+def test_unique(tmp_path):
+    yaml = """
+user:
+    id: Integer
+    bandwidth: Integer
+    valasp:
+        unique: [id]
+    """
+    out, err = call_main_on_yaml_and_asp(tmp_path, yaml, "user(1,10). user(2,10).")
+    assert 'ALL VALID!' in out
+    assert not err
+
+    out, err = call_main_on_yaml_and_asp(tmp_path, yaml, "user(1,10). user(2,10). user(1,20).")
+    assert 'duplicate key id=1' in out
+    assert not err
+
+
+def test_models_and_quiet(tmp_path):
+    yaml = """
+valasp:
+    asp: |+
+        {a(1); a(2)} = 1.
+a:
+    value: Integer
+    """
+    out, err = call_main_on_yaml_and_asp(tmp_path, yaml)
+    assert out.count('Answer: ') == 1
+    assert not err
+
+    for models in [['--models', '0'], ['--models=2']]:
+        out, err = call_main(tmp_path, [(tmp_path / "input.yaml").as_posix()] + models)
+        assert 'Answer: a(1)\n==========\n' in out
+        assert 'Answer: a(2)\n==========\n' in out
+        assert not err
+
+    out, err = call_main(tmp_path, [(tmp_path / "input.yaml").as_posix(), '--quiet', '--models', '0'])
+    assert 'ALL VALID' in out
+    assert 'Answer: ' not in out
+    assert not err
+
+    with pytest.raises(SystemExit) as error:
+        call_main(tmp_path, [(tmp_path / "input.yaml").as_posix(), '--models', 'all'])
+    assert error.value.code == 1
+
+
+def test_clingo_args(tmp_path):
+    yaml = """
+valasp:
+    asp: |+
+        {a(1); a(2)} = 1.
+a:
+    value: Integer
+    """
+    (tmp_path / "input.yaml").write_text(yaml)
+    out, err = call_main(tmp_path, [(tmp_path / "input.yaml").as_posix(), '--clingo-args', '-n 0 -t 2'])
+    assert out.count('Answer: ') == 2
+    assert not err
+
+    out, err = call_main(tmp_path, [(tmp_path / "input.yaml").as_posix(), '--clingo-args=--no-such-option'])
+    assert 'VALIDATION FAILED' not in out
+    assert 'no-such-option' in err
+
+
+def test_table(tmp_path):
+    yaml = """
+user:
+    id: Integer
+    name: Alpha
+    birth: Date
+    valasp:
+        unique: [id]
+    """
+    (tmp_path / "input.yaml").write_text(yaml)
+    (tmp_path / "users.csv").write_text("name,id,birth\nalice,1,2000-01-31\nbob,2,1999-12-01\n")
+    (tmp_path / "users.jsonl").write_text('{"id": 3, "name": "carol", "birth": [2001, 2, 28]}\n')
+    yaml_file = (tmp_path / "input.yaml").as_posix()
+    csv_table = ['--table', f'user={(tmp_path / "users.csv").as_posix()}']
+    jsonl_table = [f'--table=user={(tmp_path / "users.jsonl").as_posix()}']
+    out, err = call_main(tmp_path, [yaml_file] + csv_table + jsonl_table)
+    assert 'ALL VALID!' in out
+    assert 'Answer: user(1,alice,(2000,1,31)) user(2,bob,(1999,12,1)) user(3,carol,(2001,2,28))' in out
+    assert not err
+
+    (tmp_path / "users.jsonl").write_text('{"id": 1, "name": "carol", "birth": [2001, 2, 28]}\n')
+    out, err = call_main(tmp_path, [yaml_file] + csv_table + jsonl_table)
+    assert 'duplicate key id=1' in out
+
+    (tmp_path / "users.csv").write_text("name,id,birth\nalice,1,2001-02-29\n")
+    out, err = call_main(tmp_path, [yaml_file] + csv_table)
+    assert 'invalid date 2001-02-29' in out
+
+    (tmp_path / "users.csv").write_text("name,birth\nalice,2001-02-28\n")
+    out, err = call_main(tmp_path, [yaml_file] + csv_table)
+    assert 'missing columns id' in out
+
+    out, err = call_main(tmp_path, [yaml_file, '--table', f'other={(tmp_path / "users.csv").as_posix()}'])
+    assert 'no class for predicate other' in out
+
+    with pytest.raises(SystemExit) as error:
+        call_main(tmp_path, [yaml_file, '--table', 'users.csv'])
+    assert error.value.code == 1
+
+
+def test_compressed_input(tmp_path):
+    yaml = """
+user:
+    id: Integer
+    """
+    (tmp_path / "input.yaml").write_text(yaml)
+    with gzip.open(tmp_path / "input.lp.gz", 'wt') as f:
+        f.write('user(1).\nuser(2).\n')
+    out, err = call_main(tmp_path, [(tmp_path / "input.yaml").as_posix(), (tmp_path / "input.lp.gz").as_posix()])
+    assert 'Answer: user(1) user(2)' in out
+    assert not err
+
+    with gzip.open(tmp_path / "input.lp.gz", 'wt') as f:
+        f.write('user(1).\nuser(a).\n')
+    out, err = call_main(tmp_path, [(tmp_path / "input.yaml").as_posix(), (tmp_path / "input.lp.gz").as_posix()])
+    assert 'VALIDATION FAILED' in out
+
+
+def test_stdin_input(tmp_path, monkeypatch):
+    yaml = """
+user:
+    id: Integer
+    """
+    (tmp_path / "input.yaml").write_text(yaml)
+    (tmp_path / "input.lp").write_text('user(3).')
+    monkeypatch.setattr('sys.stdin', io.StringIO('user(1).\nuser(2).\n'))
+    out, err = call_main(tmp_path, [(tmp_path / "input.yaml").as_posix(), '-', (tmp_path / "input.lp").as_posix()])
+    assert 'Answer: user(1) user(2) user(3)' in out
+    assert not err
+
+    monkeypatch.setattr('sys.stdin', io.StringIO('user(a).\n'))
+    out, err = call_main(tmp_path, [(tmp_path / "input.yaml").as_posix(), '-'])
+    assert 'VALIDATION FAILED' in out
+
+
+def test_snapshot(tmp_path):
+    yaml = """
+user:
+    id: Integer
+    """
+    (tmp_path / "input.yaml").write_text(yaml)
+    (tmp_path / "instance.lp").write_text('user(1). user(2).')
+    (tmp_path / "encoding.lp").write_text('count(N) :- N = #count{X : user(X)}.')
+    (tmp_path / "derive.lp").write_text('derived(X) :- user(X).')
+    yaml_file = (tmp_path / "input.yaml").as_posix()
+    snapshot = (tmp_path / "instance.snapshot").as_posix()
+    out, err = call_main(tmp_path, [yaml_file, (tmp_path / "instance.lp").as_posix(), (tmp_path / "derive.lp").as_posix(),
+                                    '--valid-only', '--save-snapshot', snapshot])
+    assert 'ALL VALID!' in out
+    assert (tmp_path / "instance.snapshot").exists()
+
+    out, err = call_main(tmp_path, [yaml_file, (tmp_path / "encoding.lp").as_posix(), f'--snapshot={snapshot}'])
+    assert 'Answer: user(1) user(2) count(2)' in out
+    assert 'derived' not in out
+
+    (tmp_path / "instance.snapshot").write_text('{"format": 1}')
+    out, err = call_main(tmp_path, [yaml_file, (tmp_path / "encoding.lp").as_posix(), f'--snapshot={snapshot}'])
+    assert 'not a snapshot' in out
+    call_main(tmp_path, [yaml_file, (tmp_path / "instance.lp").as_posix(), '--valid-only', '--save-snapshot', snapshot])
+
+    (tmp_path / "input.yaml").write_text(yaml.replace('id: Integer', 'id: Integer\n    bandwidth: Integer'))
+    out, err = call_main(tmp_path, [yaml_file, (tmp_path / "encoding.lp").as_posix(), '--snapshot', snapshot])
+    assert 'snapshot of a different specification' in out
+
+    with pytest.raises(SystemExit) as error:
+        call_main(tmp_path, [yaml_file, '--snapshot'])
+    assert error.value.code == 1
+
+
+def test_cache(tmp_path, monkeypatch):
+    yaml = """
+user:
+    id:
+        type: Integer
+        enum_file: ids.txt
+    """
+    (tmp_path / "input.yaml").write_text(yaml)
+    (tmp_path / "ids.txt").write_text("1\n2\n")
+    (tmp_path / "input.lp").write_text('user(1). user(2).')
+    cache = tmp_path / "cache"
+    args = [(tmp_path / "input.yaml").as_posix(), (tmp_path / "input.lp").as_posix(), '--cache', cache.as_posix()]
+
+    def run(*more):
+        return call_main(tmp_path, args + list(more))
+
+    out, err = run()
+    assert 'Answer: user(1) user(2)' in out
+    assert len(list(cache.iterdir())) == 1
+    (next(cache.iterdir())).write_text('cached output\n')
+    out, err = run()
+    assert out == 'cached output\n'
+
+    out, err = run('--valid-only')
+    assert 'ALL VALID!' in out and 'Answer' not in out
+    assert len(list(cache.iterdir())) == 2
+
+    (tmp_path / "input.lp").write_text('user(1). user(2). user(3).')
+    out, err = run()
+    assert 'Should be one of the values' in out
+    assert len(list(cache.iterdir())) == 3
+
+    (tmp_path / "ids.txt").write_text("1\n2\n3\n")
+    clear_cache()
+    out, err = run()
+    assert 'Answer: user(1) user(2) user(3)' in out
+    assert len(list(cache.iterdir())) == 4
+
+    (tmp_path / "input.yaml").write_text(yaml.rstrip() + "\n    valasp:\n        unique: [id]\n")
+    out, err = run()
+    assert 'Answer: user(1) user(2) user(3)' in out
+    assert len(list(cache.iterdir())) == 5
+
+    monkeypatch.setattr('sys.stdin', io.StringIO('user(1).'))
+    out, err = call_main(tmp_path, [(tmp_path / "input.yaml").as_posix(), '-', '--cache', cache.as_posix()])
+    assert 'Answer: user(1)' in out
+    assert len(list(cache.iterdir())) == 5
+
+
+def test_watch(tmp_path, monkeypatch):
+    yaml = """
+user:
+    id: Integer
+    """
+    (tmp_path / "input.yaml").write_text(yaml)
+    (tmp_path / "input.lp").write_text('user(1).')
+    mtime = [10 ** 9]
+
+    def write(filename, content):
+        (tmp_path / filename).write_text(content)
+        mtime[0] += 10
+        os.utime(tmp_path / filename, (mtime[0], mtime[0]))
+
+    edits = iter([
+        lambda: None,
+        lambda: write("input.lp", 'user(1). user(2).'),
+        lambda: write("input.lp", 'user(a).'),
+        lambda: write("input.yaml", yaml.replace('Integer', 'Alpha')),
+        lambda: write("input.yaml", 'user: [1'),
+        lambda: write("input.lp", 'user(b).'),
+        lambda: write("input.yaml", yaml),
+    ])
+
+    def sleep(_):
+        edit = next(edits, None)
+        if edit is None:
+            raise KeyboardInterrupt
+        edit()
+
+    monkeypatch.setattr('time.sleep', sleep)
+    modules = []
+    load_module = valasp.main.load_module
+    monkeypatch.setattr(valasp.main, 'load_module', lambda *a: modules.append(load_module(*a)) or modules[-1])
+    out, err = call_main(tmp_path, [(tmp_path / "input.yaml").as_posix(), (tmp_path / "input.lp").as_posix(), '--watch'])
+    runs = out.split('# changed: ')
+    assert len(runs) == 7
+    assert 'Answer: user(1)\n' in runs[0]
+    assert 'input.lp' in runs[1] and 'Answer: user(1) user(2)' in runs[1]
+    assert 'VALIDATION FAILED' in runs[2]
+    assert 'input.yaml' in runs[3] and 'Answer: user(a)' in runs[3]
+    assert 'input.yaml' in runs[4] and 'Answer' not in runs[4] and 'VALIDATION' not in runs[4]
+    assert 'input.lp' in runs[5] and 'Answer' not in runs[5] and 'VALIDATION' not in runs[5]
+    assert err.count('\n') >= 2
+    assert 'input.yaml' in runs[6] and 'VALIDATION FAILED' in runs[6]
+    assert modules[0] is modules[1] is modules[2]
+    assert modules[2] is not modules[3]
+
+    with pytest.raises(SystemExit) as error:
+        call_main(tmp_path, [(tmp_path / "input.yaml").as_posix(), '-', '--watch'])
+    assert error.value.code == 1
+
+
+def test_output(tmp_path):
+    yaml = """
+valasp:
+    output: [assign]
+    asp: |+
+        item(1..3).
+        assign(X,X+{}) :- item(X).
+item:
+    value: Integer
+assign:
+    item: Integer
+    slot:
+        type: Integer
+        max: 3
+    valasp:
+        validate_predicate: False
+    """
+    out, err = call_main_on_yaml_and_asp(tmp_path, yaml.format(0), for_print=True)
+    assert "output_validator=context.valasp_output_validator(['assign'])" in out
+    assert not err
+
+    out, err = call_main_on_yaml_and_asp(tmp_path, yaml.format(0))
+    assert 'Answer: ' in out
+    assert 'VALIDATION FAILED' not in out
+    assert not err
+
+    out, err = call_main_on_yaml_and_asp(tmp_path, yaml.format(1))
+    assert 'Answer: ' not in out
+    assert 'VALIDATION FAILED' in out
+    assert 'invalid output' in out
+    assert not err
+
+    out, err = call_main_on_yaml_and_asp(tmp_path, yaml.replace('output: [assign]', 'output: [other]').format(0))
+    assert 'other is not a symbol' in err
+
+
 def test_wrong_yaml(tmp_path):
     yaml = """
 valasp:
@@ -96,7 +461,31 @@ valasp:
     max_arity: 10
     """
     out, err = call_main_on_yaml_and_asp(tmp_path, yaml, for_print=True)
-    assert 'context = valasp.core.Context(wrap=[], max_arity=10)' in out
+    assert 'valasp_template = valasp.core.ContextTemplate(valasp_build, wrap=[], max_arity=10, lazy=False)' in out
+    assert not err
+
+
+def test_lazy(tmp_path):
+    yaml = """
+valasp:
+    lazy: true
+    asp: node(1).
+node:
+    value: Integer
+edge:
+    source: Integer
+    dest: Integer
+    """
+    out, err = call_main_on_yaml_and_asp(tmp_path, yaml, for_print=True)
+    assert 'lazy=True)' in out
+    assert not err
+
+    out, err = call_main_on_yaml_and_asp(tmp_path, yaml)
+    assert 'ALL VALID' in out
+    assert not err
+
+    out, err = call_main_on_yaml_and_asp(tmp_path, yaml.replace('node(1).', 'node(a).'))
+    assert 'VALIDATION FAILED' in out
     assert not err
 
 
@@ -109,7 +498,7 @@ valasp:
         - C
     """
     out, err = call_main_on_yaml_and_asp(tmp_path, yaml, for_print=True)
-    assert 'context = valasp.core.Context(wrap=[a, b, C], max_arity=16)' in out
+    assert 'valasp_template = valasp.core.ContextTemplate(valasp_build, wrap=[a, b, C], max_arity=16, lazy=False)' in out
     assert not err
 
 
@@ -128,6 +517,27 @@ valasp:
     assert not err
 
 
+def test_wrap_pure_at_terms(tmp_path):
+    yaml = """
+valasp:
+    python: |+
+        def succ(x): return x.number + 1
+    wrap:
+        - name: succ
+          pure: true
+          maxsize: 8
+    asp:
+        a(@succ(0)). b(@succ(0)).
+    """
+    out, err = call_main_on_yaml_and_asp(tmp_path, yaml, for_print=True)
+    assert 'context.valasp_pure(succ, maxsize=8)' in out
+    assert not err
+
+    out, err = call_main_on_yaml_and_asp(tmp_path, yaml)
+    assert 'Answer: a(1) b(1)' in out
+    assert not err
+
+
 def test_wrap_at_terms_from_external_file(tmp_path):
     at_terms = tmp_path / 'at_terms.py'
     at_terms.write_text('def succ(x): return x.number + 1')
@@ -178,6 +588,93 @@ predicate:
     assert not err
 
 
+def test_count_and_sum_group_by(tmp_path):
+    yaml = """
+assign:
+    user: Integer
+    server: Integer
+    task:
+        type: Integer
+        count: {max: 2, group_by: [user]}
+    bandwidth:
+        type: Integer
+        sum+: {max: 100, group_by: [server]}
+    """
+    out, err = call_main_on_yaml_and_asp(tmp_path, yaml, "assign(1,1,1,50). assign(1,1,2,50). assign(2,2,3,10).")
+    assert 'ALL VALID!' in out
+    assert not err
+
+    out, err = call_main_on_yaml_and_asp(tmp_path, yaml, "assign(1,1,1,50). assign(1,2,2,50). assign(1,2,3,10).")
+    assert 'count of task in predicate assign may exceed 2 for user 1' in out
+    assert not err
+
+    out, err = call_main_on_yaml_and_asp(tmp_path, yaml, "assign(1,1,1,50). assign(2,1,2,60). assign(3,2,3,100).")
+    assert 'sum of bandwidth in predicate assign may exceed 100 for server 1' in out
+    assert not err
+
+
+def test_graph(tmp_path):
+    yaml = """
+before:
+    first: Integer
+    second: Integer
+    valasp:
+        graph: {from: first, to: second, acyclic: true, connected: true}
+    """
+    out, err = call_main_on_yaml_and_asp(tmp_path, yaml, "before(1,2). before(2,3). before(1,3).")
+    assert 'ALL VALID!' in out
+    assert not err
+
+    out, err = call_main_on_yaml_and_asp(tmp_path, yaml, "before(1,2). before(2,3). before(3,1).")
+    assert 'predicate before is not acyclic: 1 -> 2 -> 3 -> 1' in out
+    assert not err
+
+    out, err = call_main_on_yaml_and_asp(tmp_path, yaml, "before(1,2). before(3,4).")
+    assert 'predicate before is not connected: no path between 1 and 3' in out
+    assert not err
+
+
+def test_enum_file(tmp_path):
+    (tmp_path / 'codes.txt').write_text('P001\nP002\nP003\n')
+    yaml = """
+product:
+    code:
+        type: String
+        enum_file: codes.txt
+    """
+    out, err = call_main_on_yaml_and_asp(tmp_path, yaml, 'product("P001"). product("P003").')
+    assert 'ALL VALID!' in out
+    assert not err
+
+    out, err = call_main_on_yaml_and_asp(tmp_path, yaml, 'product("P001"). product("P004").')
+    assert 'Should be one of the values in' in out
+    assert not err
+
+
+def test_recursive_symbol(tmp_path):
+    yaml = """
+cons:
+    head:
+        type: Integer
+        min: 1
+    tail: cons
+    valasp:
+        validate_predicate: False
+list:
+    value: cons
+    """
+    term = 'nil'
+    for i in range(5000, 0, -1):
+        term = f'cons({i},{term})'
+    out, err = call_main_on_yaml_and_asp(tmp_path, yaml, f"list({term}).")
+    assert 'ALL VALID!' in out
+    assert not err
+
+    out, err = call_main_on_yaml_and_asp(tmp_path, yaml, "list(cons(1,cons(0,nil))).")
+    assert 'Should be >= 1' in out
+    assert not err
+
+
 def test_after_grounding(tmp_path):
     yaml = """
 valasp:
@@ -218,3 +715,97 @@ def test_auto_blacklist(tmp_path):
     assert 'VALIDATION FAILED' in out
     assert 'person/2 is blacklisted' in out
     assert not err
+
+
+IMPORT_TIME_BUDGET = 0.5  # seconds, for importing valasp.main in a fresh interpreter
+
+
+def run_python(code: str, env: dict = None) -> str:
+    env = dict(os.environ, **env) if env else None
+    return subprocess.run([sys.executable, '-c', code], stdout=subprocess.PIPE, check=True, text=True, env=env).stdout.strip()
+
+
+def test_print_does_not_import_clingo(tmp_path):
+    yaml_file = tmp_path / "input.yaml"
+    yaml_file.write_text("""
+bday:
+    name: Alpha
+    date: Integer
+    """)
+    out = run_python(f"""
+import io, sys
+from valasp.main import main
+main([{yaml_file.as_posix()!r}, '--print'], stdout=io.StringIO())
+print('clingo' in sys.modules)
+""")
+    assert out == 'False'
+
+
+@pytest.mark.skipif(not os.environ.get('VALASP_BENCHMARK'), reason='timing benchmark; set VALASP_BENCHMARK=1 to run')
+def test_startup_time_budget():
+    elapsed = float(run_python("""
+import time
+start = time.perf_counter()
+import valasp.main
+print(time.perf_counter() - start)
+"""))
+    assert elapsed < IMPORT_TIME_BUDGET
+
+
+def test_spec_key_is_stable_across_processes(tmp_path):
+    yaml = """
+user:
+    id:
+        type: Integer
+        enum: [5, 3, 1, 4]
+    name:
+        type: Alpha
+        enum: [alice, bob, carol, dave]
+    code:
+        type: Integer
+        enum_file: codes.txt
+    valasp:
+        unique: [id]
+follows:
+    first:
+        type: Integer
+        references:
+            predicate: user
+            term: id
+    second:
+        type: Integer
+        references:
+            predicate: user
+            term: code
+    """
+    keys = set()
+    for seed, directory in (('1', 'a'), ('2', 'a'), ('3', 'b')):
+        (tmp_path / directory).mkdir(exist_ok=True)
+        (tmp_path / directory / "input.yaml").write_text(yaml)
+        (tmp_path / directory / "codes.txt").write_text("1\n2\n")
+        keys.add(run_python(f"""
+from valasp.main import process_yaml, spec_key
+print(spec_key(process_yaml({(tmp_path / directory / "input.yaml").as_posix()!r})[0]))
+""", env={'PYTHONHASHSEED': seed}))
+    assert len(keys) == 1
+
+
+def test_snapshot_across_processes(tmp_path):
+    (tmp_path / "input.yaml").write_text("""
+user:
+    id: Integer
+    name:
+        type: Alpha
+        enum: [alice, bob, carol, dave]
+    """)
+    (tmp_path / "instance.lp").write_text('user(1,alice). user(2,bob).')
+    snapshot = (tmp_path / "instance.snapshot").as_posix()
+
+    def run(seed, *args):
+        return run_python(f"""
+from valasp.main import main
+main({[(tmp_path / "input.yaml").as_posix()] + list(args)!r})
+""", env={'PYTHONHASHSEED': seed})
+
+    assert 'ALL VALID!' in run('1', (tmp_path / "instance.lp").as_posix(), '--valid-only', '--save-snapshot', snapshot)
+    assert 'Answer: user(1,alice) user(2,bob)' in run('2', '--snapshot', snapshot)
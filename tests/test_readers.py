@@ -0,0 +1,42 @@
+import pytest
+
+from valasp.readers import read_csv, read_jsonl, read_table
+
+
+def test_read_csv(tmp_path):
+    filename = tmp_path / "input.csv"
+    filename.write_text('b,a,c\n1,x,"y,z"\n\n2,w,v\n')
+    assert list(read_csv(filename.as_posix(), ['a', 'b'])) == [('x', '1'), ('w', '2')]
+    assert list(read_table(filename.as_posix(), ['c'])) == [('y,z',), ('v',)]
+
+    with pytest.raises(ValueError):
+        list(read_csv(filename.as_posix(), ['a', 'd']))
+
+    filename.write_text('a,b\n1,2,3\n')
+    with pytest.raises(ValueError):
+        list(read_csv(filename.as_posix(), ['a']))
+
+
+def test_read_jsonl(tmp_path):
+    filename = tmp_path / "input.jsonl"
+    filename.write_text('{"a": 1, "b": [1, [2, "x"]], "c": 0}\n\n{"a": "s", "b": []}\n')
+    assert list(read_jsonl(filename.as_posix(), ['b', 'a'])) == [((1, (2, 'x')), 1), ((), 's')]
+    assert list(read_table(filename.as_posix(), ['a'])) == [(1,), ('s',)]
+
+    with pytest.raises(ValueError):
+        list(read_jsonl(filename.as_posix(), ['c']))
+
+    filename.write_text('[1, 2]\n')
+    with pytest.raises(ValueError):
+        list(read_jsonl(filename.as_posix(), ['a']))
+
+
+def test_read_table_is_lazy(tmp_path):
+    filename = tmp_path / "input.csv"
+    filename.write_text('a\n' + '\n'.join(str(i) for i in range(1000)) + '\n')
+    rows = read_table(filename.as_posix(), ['a'])
+    assert next(rows) == ('0',)
+    assert next(rows) == ('1',)
+
+    with pytest.raises(ValueError):
+        read_table('input.txt', ['a'])
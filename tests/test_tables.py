@@ -0,0 +1,52 @@
+import pytest
+
+from valasp.tables import Table, INT, STR, OBJECT
+
+
+class Row:
+    def __init__(self, id, name, extra):
+        self.id = id
+        self.name = name
+        self.extra = extra
+
+
+def test_table_columns():
+    table = Table({'id': INT, 'name': STR, 'extra': OBJECT})
+    table.append(Row(1, 'a', (2020, 1, 1)))
+    table.append(Row(2, 'b', None))
+    table.append(Row(3, 'a', 'x'))
+    assert len(table) == 3
+    assert table.names() == ['id', 'name', 'extra']
+    assert table.kind('name') == STR
+    assert list(table.column('id')) == [1, 2, 3]
+    assert table.codes('id').typecode == 'i'
+    assert table.column('name') == ['a', 'b', 'a']
+    assert list(table.codes('name')) == [0, 1, 0]
+    assert table.vocabulary('name') == ['a', 'b']
+    assert table.column('extra') == [(2020, 1, 1), None, 'x']
+
+
+def test_table_interns_strings():
+    table = Table({'name': STR})
+    table.append(Row(0, ''.join(['a', 'b']), None))
+    table.append(Row(0, ''.join(['a', 'b']), None))
+    first, second = table.column('name')
+    assert first is second
+
+
+def test_unknown_kind():
+    with pytest.raises(ValueError):
+        Table({'id': 'float'})
+
+
+def test_to_numpy():
+    numpy = pytest.importorskip('numpy')
+    table = Table({'id': INT, 'name': STR, 'extra': OBJECT})
+    table.append(Row(1, 'a', (2020, 1, 1)))
+    table.append(Row(2, 'b', (2021, 1, 1)))
+    columns = table.to_numpy()
+    assert columns['id'].tolist() == [1, 2]
+    assert columns['name'].tolist() == ['a', 'b']
+    assert columns['extra'].shape == (2,)
+    assert columns['extra'][0] == (2020, 1, 1)
+    assert numpy.shares_memory(columns['id'], numpy.frombuffer(table.codes('id'), dtype=numpy.intc))
@@ -1,4 +1,6 @@
 import base64
+import os
+
 import pytest
 import yaml
 
@@ -36,13 +38,13 @@ def test_symbol_type_valasp():
         assert "@context.valasp(validate_predicate=False, with_fun=valasp.domain.primitive_types.Fun.%s, auto_blacklist=False)" % i in output
         assert "\tvalue: Integer" in output
         assert "\tdef __post_init__(self):" not in output
-        assert "\tdef after_grounding_predicate(cls):" in output
+        assert "\tdef after_grounding_predicate(cls, state):" in output
         assert "\t\tcls.a = 0" in output
         assert "\t\tprint(cls.a)" in output
 
 
 def test_symbol_custom_invalid():
-    for i in {'my', 'Date', 'bday'}:
+    for i in {'my', 'Time', 'bday'}:
         yaml_input = """
         predicate:
             value: %s   
@@ -209,11 +211,11 @@ def test_symbol_sum_positive():
     assert "\tvalue: Integer" in output
     assert "\tdef __post_init__(self):" in output
     assert "\t\tif self.value > 0:" in output
-    assert "\t\t\tself.__class__.sum_positive_of_value += self.value" in output
-    assert "\tdef before_grounding_init_positive_sum_value(cls): cls.sum_positive_of_value = 0" in output
-    assert "\tdef after_grounding_check_positive_sum_value(cls):" in output
-    assert "\t\tif cls.sum_positive_of_value > 100: raise ValueError('sum of value in predicate predicate may exceed 100')" in output
-    assert "\t\tif cls.sum_positive_of_value < 10: raise ValueError('sum of value in predicate predicate cannot reach 10')" in output
+    assert "\t\t\tself.valasp_state().sum_positive_of_value += self.value" in output
+    assert "\tdef before_grounding_init_positive_sum_value(cls, state): state.sum_positive_of_value = 0" in output
+    assert "\tdef after_grounding_check_positive_sum_value(cls, state):" in output
+    assert "\t\tif state.sum_positive_of_value > 100: raise ValueError('sum of value in predicate predicate may exceed 100')" in output
+    assert "\t\tif state.sum_positive_of_value < 10: raise ValueError('sum of value in predicate predicate cannot reach 10')" in output
 
 
 def test_symbol_sum_positive_default():
@@ -230,10 +232,10 @@ def test_symbol_sum_positive_default():
     assert "\tvalue: Integer" in output
     assert "\tdef __post_init__(self):" in output
     assert "\t\tif self.value > 0:" in output
-    assert "\t\t\tself.__class__.sum_positive_of_value += self.value" in output
-    assert "\tdef before_grounding_init_positive_sum_value(cls): cls.sum_positive_of_value = 0" in output
-    assert "\tdef after_grounding_check_positive_sum_value(cls):" in output
-    assert "\t\tif cls.sum_positive_of_value > 2147483647: raise ValueError('sum of value in predicate predicate may exceed 2147483647')" in output
+    assert "\t\t\tself.valasp_state().sum_positive_of_value += self.value" in output
+    assert "\tdef before_grounding_init_positive_sum_value(cls, state): state.sum_positive_of_value = 0" in output
+    assert "\tdef after_grounding_check_positive_sum_value(cls, state):" in output
+    assert "\t\tif state.sum_positive_of_value > 2147483647: raise ValueError('sum of value in predicate predicate may exceed 2147483647')" in output
 
 
 def test_symbol_sum_positive_missing_max():
@@ -251,11 +253,11 @@ def test_symbol_sum_positive_missing_max():
     assert "\tvalue: Integer" in output
     assert "\tdef __post_init__(self):" in output
     assert "\t\tif self.value > 0:" in output
-    assert "\t\t\tself.__class__.sum_positive_of_value += self.value" in output
-    assert "\tdef before_grounding_init_positive_sum_value(cls): cls.sum_positive_of_value = 0" in output
-    assert "\tdef after_grounding_check_positive_sum_value(cls):" in output
-    assert "\t\tif cls.sum_positive_of_value > 2147483647: raise ValueError('sum of value in predicate predicate may exceed 2147483647')" in output
-    assert "\t\tif cls.sum_positive_of_value < 10: raise ValueError('sum of value in predicate predicate cannot reach 10')" in output
+    assert "\t\t\tself.valasp_state().sum_positive_of_value += self.value" in output
+    assert "\tdef before_grounding_init_positive_sum_value(cls, state): state.sum_positive_of_value = 0" in output
+    assert "\tdef after_grounding_check_positive_sum_value(cls, state):" in output
+    assert "\t\tif state.sum_positive_of_value > 2147483647: raise ValueError('sum of value in predicate predicate may exceed 2147483647')" in output
+    assert "\t\tif state.sum_positive_of_value < 10: raise ValueError('sum of value in predicate predicate cannot reach 10')" in output
 
 
 def test_symbol_sum_negative():
@@ -274,11 +276,11 @@ def test_symbol_sum_negative():
     assert "\tvalue: Integer" in output
     assert "\tdef __post_init__(self):" in output
     assert "\t\tif self.value < 0:" in output
-    assert "\t\t\tself.__class__.sum_negative_of_value += self.value" in output
-    assert "\tdef before_grounding_init_negative_sum_value(cls): cls.sum_negative_of_value = 0" in output
-    assert "\tdef after_grounding_check_negative_sum_value(cls):" in output
-    assert "\t\tif cls.sum_negative_of_value < -100: raise ValueError('sum of value in predicate predicate may exceed -100')" in output
-    assert "\t\tif cls.sum_negative_of_value > -10: raise ValueError('sum of value in predicate predicate cannot reach -10')" in output
+    assert "\t\t\tself.valasp_state().sum_negative_of_value += self.value" in output
+    assert "\tdef before_grounding_init_negative_sum_value(cls, state): state.sum_negative_of_value = 0" in output
+    assert "\tdef after_grounding_check_negative_sum_value(cls, state):" in output
+    assert "\t\tif state.sum_negative_of_value < -100: raise ValueError('sum of value in predicate predicate may exceed -100')" in output
+    assert "\t\tif state.sum_negative_of_value > -10: raise ValueError('sum of value in predicate predicate cannot reach -10')" in output
 
 
 def test_symbol_sum_negative_default():
@@ -295,10 +297,10 @@ def test_symbol_sum_negative_default():
     assert "\tvalue: Integer" in output
     assert "\tdef __post_init__(self):" in output
     assert "\t\tif self.value < 0:" in output
-    assert "\t\t\tself.__class__.sum_negative_of_value += self.value" in output
-    assert "\tdef before_grounding_init_negative_sum_value(cls): cls.sum_negative_of_value = 0" in output
-    assert "\tdef after_grounding_check_negative_sum_value(cls):" in output
-    assert "\t\tif cls.sum_negative_of_value < -2147483648: raise ValueError('sum of value in predicate predicate may exceed -2147483648')" in output
+    assert "\t\t\tself.valasp_state().sum_negative_of_value += self.value" in output
+    assert "\tdef before_grounding_init_negative_sum_value(cls, state): state.sum_negative_of_value = 0" in output
+    assert "\tdef after_grounding_check_negative_sum_value(cls, state):" in output
+    assert "\t\tif state.sum_negative_of_value < -2147483648: raise ValueError('sum of value in predicate predicate may exceed -2147483648')" in output
 
 
 def test_symbol_sum_negative_missing_min():
@@ -316,11 +318,11 @@ def test_symbol_sum_negative_missing_min():
     assert "\tvalue: Integer" in output
     assert "\tdef __post_init__(self):" in output
     assert "\t\tif self.value < 0:" in output
-    assert "\t\t\tself.__class__.sum_negative_of_value += self.value" in output
-    assert "\tdef before_grounding_init_negative_sum_value(cls): cls.sum_negative_of_value = 0" in output
-    assert "\tdef after_grounding_check_negative_sum_value(cls):" in output
-    assert "\t\tif cls.sum_negative_of_value < -2147483648: raise ValueError('sum of value in predicate predicate may exceed -2147483648')" in output
-    assert "\t\tif cls.sum_negative_of_value > -10: raise ValueError('sum of value in predicate predicate cannot reach -10')" in output
+    assert "\t\t\tself.valasp_state().sum_negative_of_value += self.value" in output
+    assert "\tdef before_grounding_init_negative_sum_value(cls, state): state.sum_negative_of_value = 0" in output
+    assert "\tdef after_grounding_check_negative_sum_value(cls, state):" in output
+    assert "\t\tif state.sum_negative_of_value < -2147483648: raise ValueError('sum of value in predicate predicate may exceed -2147483648')" in output
+    assert "\t\tif state.sum_negative_of_value > -10: raise ValueError('sum of value in predicate predicate cannot reach -10')" in output
 
 
 def test_symbol_count():
@@ -339,11 +341,63 @@ def test_symbol_count():
         assert "class Predicate:" in output
         assert "\tvalue: %s" % i in output
         assert "\tdef __post_init__(self):" in output
-        assert "\t\tself.__class__.count_of_value += 1" in output
-        assert "\tdef before_grounding_init_count_value(cls): cls.count_of_value = 0" in output
-        assert "\tdef after_grounding_check_count_value(cls):" in output
-        assert "\t\tif cls.count_of_value > 100: raise ValueError('count of value in predicate predicate may exceed 100')" in output
-        assert "\t\tif cls.count_of_value < 10: raise ValueError('count of value in predicate predicate cannot reach 10')" in output
+        assert "\t\tself.valasp_state().count_of_value += 1" in output
+        assert "\tdef before_grounding_init_count_value(cls, state): state.count_of_value = 0" in output
+        assert "\tdef after_grounding_check_count_value(cls, state):" in output
+        assert "\t\tif state.count_of_value > 100: raise ValueError('count of value in predicate predicate may exceed 100')" in output
+        assert "\t\tif state.count_of_value < 10: raise ValueError('count of value in predicate predicate cannot reach 10')" in output
+
+
+def test_symbol_count_group_by():
+    yaml_input = """
+    assign:
+        user: Integer
+        task:
+            type: Integer
+            count:
+                max: 3
+                group_by: [user]
+    """
+    result = yaml.safe_load(yaml_input)
+    output = Symbol(result['assign'], 'assign').convert2python()
+    assert "\t\tself.valasp_state().count_of_task[self.user] += 1" in output
+    assert "\tdef before_grounding_init_count_task(cls, state): state.count_of_task = collections.defaultdict(int)" in output
+    assert "\t\tinvalid = sorted(str(k) for k, v in state.count_of_task.items() if v > 3)" in output
+    assert "\t\tif invalid: raise ValueError('count of task in predicate assign may exceed 3 for user ' + ', '.join(invalid[:10]))" in output
+
+
+def test_symbol_sum_negative_group_by():
+    yaml_input = """
+    cost:
+        user: Integer
+        day: Integer
+        value:
+            type: Integer
+            sum-:
+                min: -100
+                group_by: [user, day]
+    """
+    result = yaml.safe_load(yaml_input)
+    output = Symbol(result['cost'], 'cost').convert2python()
+    assert "\t\tif self.value < 0:" in output
+    assert "\t\t\tself.valasp_state().sum_negative_of_value[(self.user, self.day)] += self.value" in output
+    assert "\t\tinvalid = sorted(str(k) for k, v in state.sum_negative_of_value.items() if v < -100)" in output
+    assert "\t\tif invalid: raise ValueError('sum of value in predicate cost may exceed -100 for (user, day) ' + ', '.join(invalid[:10]))" in output
+
+
+def test_symbol_group_by_missing_term():
+    yaml_input = """
+    assign:
+        task:
+            type: Integer
+            count:
+                max: 3
+                group_by: [user]
+    """
+    result = yaml.safe_load(yaml_input)
+    with pytest.raises(ValueError) as error:
+        Symbol(result['assign'], 'assign')
+    assert 'group_by: user is not a term name' in str(error.value)
 
 
 def test_symbol_having():
@@ -455,3 +509,132 @@ def test_user_defined_term():
     result = yaml.safe_load(yaml_input)
     lines = Yaml2Python(result).convert2python()
     assert 'term: Pred' in '\n'.join(lines)
+
+
+def test_references():
+    yaml_input = """
+        user:
+            id: Integer
+            name: Alpha
+
+        assign:
+            user:
+               type: Integer
+               references: {predicate: user, term: id}
+            task: Integer
+    """
+    result = yaml.safe_load(yaml_input)
+    output = '\n'.join(Yaml2Python(result).convert2python())
+    assert '\t\tself.valasp_state().keys_of_id.add(self.id)' in output
+    assert '\tdef before_grounding_init_keys_id(cls, state): state.keys_of_id = set()' in output
+    assert '\t\tself.valasp_state().references_of_user.add(self.user)' in output
+    assert '\t\tdangling = state.references_of_user - User.valasp_state().keys_of_id' in output
+
+
+def test_invalid_references():
+    for references, message in [
+        ('{predicate: person, term: id}', 'person is not a symbol'),
+        ('{predicate: user, term: code}', 'code is not a term of user'),
+        ('{predicate: user, term: name}', 'name of user has a different type'),
+    ]:
+        yaml_input = """
+            user:
+                id: Integer
+                name: Alpha
+
+            assign:
+                user:
+                   type: Integer
+                   references: %s
+        """ % references
+        result = yaml.safe_load(yaml_input)
+        with pytest.raises(ValueError) as error:
+            Yaml2Python(result).convert2python()
+        assert message in str(error.value)
+
+    yaml_input = """
+        user:
+            id: Integer
+            valasp:
+                validate_predicate: False
+
+        assign:
+            user:
+               type: Integer
+               references: {predicate: user, term: id}
+    """
+    with pytest.raises(ValueError) as error:
+        Yaml2Python(yaml.safe_load(yaml_input)).convert2python()
+    assert 'user must be validated' in str(error.value)
+
+
+def test_unique():
+    yaml_input = """
+    user:
+        id: Integer
+        bandwidth: Integer
+        valasp:
+            unique: [id]
+    """
+    result = yaml.safe_load(yaml_input)
+    output = Symbol(result["user"], "user").convert2python()
+    assert "@context.valasp(validate_predicate=True, with_fun=valasp.domain.primitive_types.Fun.FORWARD_IMPLICIT, auto_blacklist=True, unique=['id'])" in output
+
+    with pytest.raises(ValueError) as error:
+        Symbol(yaml.safe_load(yaml_input.replace('[id]', '[userid]'))["user"], "user")
+    assert 'userid is not a term name' in str(error.value)
+
+
+def test_graph():
+    yaml_input = """
+    before:
+        first: Integer
+        second: Integer
+        valasp:
+            graph: {from: first, to: second, acyclic: true, connected: true}
+    """
+    result = yaml.safe_load(yaml_input)
+    output = Symbol(result['before'], 'before').convert2python()
+    assert "\t\tself.valasp_state().graph_edges.append((self.first, self.second))" in output
+    assert "\tdef before_grounding_init_graph(cls, state): state.graph_edges = []" in output
+    assert "\t\tcycle = valasp.graphs.find_cycle(state.graph_edges)" in output
+    assert "\t\tdisconnected = valasp.graphs.find_disconnected(state.graph_edges)" in output
+
+    with pytest.raises(ValueError) as error:
+        Symbol(yaml.safe_load(yaml_input.replace('to: second', 'to: third'))['before'], 'before')
+    assert 'graph: to: third is not a term name' in str(error.value)
+
+
+def test_enum_file():
+    yaml_input = """
+    product:
+        id:
+            type: Integer
+            enum_file: ids.txt
+        code:
+            type: String
+            enum_file: data/codes.txt
+    """
+    result = yaml.safe_load(yaml_input)
+    yaml2python = Yaml2Python(result, base_dir='/specs')
+    output = '\n'.join(yaml2python.convert2python())
+    assert yaml2python.enum_files() == ['/specs/data/codes.txt', '/specs/ids.txt']
+    ids = base64.b64encode('ids.txt'.encode())
+    codes = base64.b64encode(os.path.normpath('data/codes.txt').encode())
+    assert f"if self.id not in valasp.enums.load_enum(os.path.join(valasp_base_directory, _({ids})), 'Integer'): raise ValueError(" in output
+    assert f"if self.code not in valasp.enums.load_enum(os.path.join(valasp_base_directory, _({codes})), 'String'): raise ValueError(" in output
+    assert f"valasp_base_directory = _({base64.b64encode(os.path.abspath('/specs').encode())})" in output
+
+
+def test_recursive_symbol():
+    yaml_input = """
+        cons:
+            head: Integer
+            tail: cons
+            valasp:
+                nil: empty
+    """
+    result = yaml.safe_load(yaml_input)
+    output = '\n'.join(Yaml2Python(result).convert2python())
+    assert "auto_blacklist=True, nil='empty')" in output
+    assert "\ttail: 'Cons'" in output
@@ -320,6 +320,25 @@ def test_yaml_valasp_max_arity_wrong_types():
             YamlValidation.validate_valasp(yaml.safe_load(yaml_input))
 
 
+def test_yaml_valasp_wrap_pure():
+    yaml_input = """
+    wrap:
+        - a
+        - name: b
+          pure: true
+          maxsize: 10
+    """
+    YamlValidation.validate_valasp(yaml.safe_load(yaml_input))
+
+    for i in ['{pure: true}', '{name: b, pure: 1}', '{name: b, maxsize: 0}', '{name: b, unknown: 0}']:
+        yaml_input = """
+        wrap:
+            - %s
+        """ % i
+        with pytest.raises(ValueError):
+            YamlValidation.validate_valasp(yaml.safe_load(yaml_input))
+
+
 def test_yaml_valasp_wrap_not_list():
     for i in ['a', 1, {'a': 1}]:
         yaml_input = """    
@@ -725,3 +744,141 @@ def test_yaml_term_invalid_pattern():
             YamlValidation.validate_symbol(yaml.safe_load(yaml_input))
 
 
+
+
+def test_yaml_term_date():
+    yaml_input = """
+    term_name_6:
+        type: Date
+        min: 2000-01-01
+        max: '2020-12-31'
+        count: 2
+    """
+    YamlValidation.validate_symbol(yaml.safe_load(yaml_input))
+
+
+def test_yaml_term_date_invalid_bounds():
+    for i in ['2001-02-29', 'today', 10, '2021-01-01T10:00:00Z']:
+        yaml_input = """
+        term_name_6:
+            type: Date
+            min: %s
+        """ % i
+        with pytest.raises(ValueError):
+            YamlValidation.validate_symbol(yaml.safe_load(yaml_input))
+
+    yaml_input = """
+    term_name_6:
+        type: Date
+        min: 2020-01-01
+        max: 2019-12-31
+    """
+    with pytest.raises(ValueError):
+        YamlValidation.validate_symbol(yaml.safe_load(yaml_input))
+
+
+def test_yaml_term_references():
+    yaml_input = """
+    term_name_6:
+        type: Integer
+        references:
+            predicate: user
+            term: id
+    """
+    YamlValidation.validate_symbol(yaml.safe_load(yaml_input))
+
+
+def test_yaml_term_invalid_references():
+    for i in ['user', '{predicate: user}', '{predicate: User, term: id}', '{predicate: user, term: id, key: id}']:
+        yaml_input = """
+        term_name_6:
+            type: Integer
+            references: %s
+        """ % i
+        with pytest.raises(ValueError):
+            YamlValidation.validate_symbol(yaml.safe_load(yaml_input))
+
+
+def test_yaml_valasp_unique():
+    yaml_input = """
+    valasp:
+        unique: [first, second]
+    """
+    YamlValidation.validate_symbol(yaml.safe_load(yaml_input))
+    for i in ['first', '[]', '[first, first]', '[First]']:
+        yaml_input = """
+        valasp:
+            unique: %s
+        """ % i
+        with pytest.raises(ValueError):
+            YamlValidation.validate_symbol(yaml.safe_load(yaml_input))
+
+
+def test_yaml_aggregate_group_by():
+    for aggregate in ['count', 'sum+']:
+        yaml_input = """
+        term_name_6:
+            type: Integer
+            %s:
+                max: 3
+                group_by: [first, second]
+        """ % aggregate
+        YamlValidation.validate_symbol(yaml.safe_load(yaml_input))
+        for i in ['first', '[]', '[first, first]', '[First]']:
+            yaml_input = """
+            term_name_6:
+                type: Integer
+                %s:
+                    max: 3
+                    group_by: %s
+            """ % (aggregate, i)
+            with pytest.raises(ValueError):
+                YamlValidation.validate_symbol(yaml.safe_load(yaml_input))
+
+
+def test_yaml_valasp_graph():
+    yaml_input = """
+    valasp:
+        graph: {from: first, to: second, acyclic: true}
+    """
+    YamlValidation.validate_symbol(yaml.safe_load(yaml_input))
+    for i in ['first', '{from: first}', '{from: first, to: second, acyclic: 1}', '{from: first, to: second, tree: true}']:
+        yaml_input = """
+        valasp:
+            graph: %s
+        """ % i
+        with pytest.raises(ValueError):
+            YamlValidation.validate_symbol(yaml.safe_load(yaml_input))
+
+
+def test_yaml_term_enum_file():
+    for i in {'Integer', 'String', 'Alpha'}:
+        yaml_input = """
+        term_name_6:
+            type: %s
+            enum_file: values.txt
+        """ % i
+        YamlValidation.validate_symbol(yaml.safe_load(yaml_input))
+        for invalid in ["''", '[a, b]', 'values.txt\n            enum: [1]']:
+            yaml_input = """
+            term_name_6:
+                type: %s
+                enum_file: %s
+            """ % (i, invalid)
+            with pytest.raises(ValueError):
+                YamlValidation.validate_symbol(yaml.safe_load(yaml_input))
+
+
+def test_yaml_valasp_nil():
+    yaml_input = """
+    valasp:
+        nil: empty
+    """
+    YamlValidation.validate_symbol(yaml.safe_load(yaml_input))
+    for i in ['Empty', '1', '[a]']:
+        yaml_input = """
+        valasp:
+            nil: %s
+        """ % i
+        with pytest.raises(ValueError):
+            YamlValidation.validate_symbol(yaml.safe_load(yaml_input))
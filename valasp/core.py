@@ -5,18 +5,171 @@
 
 An instance of :class:`Context` can wrap one or more classes and functions to be used as @-terms by an ASP system.
 Classes can be registered by using a convenient decorator, and are used to inject data validation into an external ASP program.
+
+Aggregates computed by registered classes (counters, sums, ...) are stored in a :class:`RunState`, which is created
+for each run of a context; hence, the same context can be used for several runs, even concurrently.
 """
 
+import contextlib as valasp_contextlib
+import contextvars as valasp_contextvars
+import functools as valasp_functools
 import inspect as valasp_inspect
 import warnings as valasp_warnings
 
 import clingo
-from types import FunctionType
-from typing import ClassVar, List, Callable, Optional, Any
+from types import FunctionType, SimpleNamespace
+from typing import ClassVar, List, Callable, Optional, Any, Dict, Iterable, Tuple, Set
 
 from valasp.domain.names import PredicateName, ClassName
-from valasp.domain.primitive_types import Type, Fun
+from valasp.domain.primitive_types import Type, Fun, Integer, String, Alpha
 from valasp.domain.raisers import ValAspWarning
+from valasp.tables import Table, INT, STR, OBJECT
+import valasp.loaders as valasp_loaders
+import valasp.snapshots as valasp_snapshots
+
+
+class RunState:
+    """The state of a single run of a :class:`Context`.
+
+    Each registered class has its own namespace in the state, which is obtained by calling ``cls.valasp_state()``
+    while the run is active.
+    Hooks (``check*``, ``before_grounding*`` and ``after_grounding*`` class methods) receive such a namespace if they
+    have a single parameter named ``state``.
+    """
+
+    def __init__(self):
+        self.__namespaces: Dict[type, SimpleNamespace] = {}
+        self.__memos: Dict[type, Dict[clingo.Symbol, Any]] = {}
+        self.__tables: Dict[type, Table] = {}
+        self.__injected: Dict[type, Set[clingo.Symbol]] = {}
+
+    def of(self, cls: ClassVar) -> SimpleNamespace:
+        """Return the namespace of the given class in this state.
+
+        :param cls: a class registered in a context
+        :return: a namespace, created on first access
+        """
+        return self.__namespaces.setdefault(cls, SimpleNamespace())
+
+    def memo(self, cls: ClassVar) -> Dict[clingo.Symbol, Any]:
+        """Return the memo table of the given class in this state.
+
+        Memo tables map symbols to already validated instances, and are used to validate recursive classes.
+        They are kept apart from namespaces, as they only serve as caches.
+
+        :param cls: a class registered in a context
+        :return: a dictionary, created on first access
+        """
+        return self.__memos.setdefault(cls, {})
+
+    def injected(self, cls: ClassVar) -> Set[clingo.Symbol]:
+        """Return the terms of the given class already validated and added as facts in this state.
+
+        :param cls: a class registered in a context
+        :return: a set of terms, created on first access
+        """
+        return self.__injected.setdefault(cls, set())
+
+    def table(self, cls: ClassVar) -> Table:
+        """Return the table of the given class in this state.
+
+        :param cls: a class processed by the ``valasp`` decorator with ``table=True``
+        :return: a table, created on first access
+        """
+        res = self.__tables.get(cls)
+        if res is None:
+            res = self.__tables[cls] = Table(cls.valasp_columns)
+        return res
+
+    @staticmethod
+    def current() -> 'RunState':
+        """Return the state of the run active in the current thread (or asyncio task).
+
+        Outside runs, a fresh state is returned, so that nothing is shared between unrelated calls.
+
+        :return: a run state
+        """
+        res = _current_run_state.get(None)
+        return res if res is not None else RunState()
+
+    @valasp_contextlib.contextmanager
+    def activate(self):
+        """Context manager making this state the current one."""
+        token = _current_run_state.set(self)
+        try:
+            yield self
+        finally:
+            _current_run_state.reset(token)
+
+
+_current_run_state = valasp_contextvars.ContextVar('valasp_run_state')
+
+
+def _valasp_state(cls) -> SimpleNamespace:
+    return RunState.current().of(cls)
+
+
+def _valasp_table(cls) -> Table:
+    return RunState.current().table(cls)
+
+
+def _valasp_active_state(method: str) -> RunState:
+    res = _current_run_state.get(None)
+    if res is None:
+        raise ValueError(f"{method} must be called during a run; use the parameters of valasp_run instead")
+    return res
+
+
+def valasp_injected(cls: ClassVar) -> Set[clingo.Symbol]:
+    """Return the terms of cls added as facts by :meth:`Context.valasp_add_facts` in the current run.
+
+    :param cls: a class registered in a context
+    :return: a set of terms
+    """
+    return RunState.current().injected(cls)
+
+
+def valasp_build_tail(cls: ClassVar, value: clingo.Symbol, fun: str, arity: int, index: int, nil: str) -> Any:
+    """Return the instance of a recursive class for the given value, or None if value is the terminator.
+
+    The chain of nested terms is first collected iteratively, up to the terminator or to a suffix already validated in
+    the current run, and then instances are created from the last term back to value.
+    Hence, the stack does not grow with the length of the chain, and shared suffixes are validated only once per run.
+    Outside runs, validated suffixes are not remembered after the call.
+
+    :param cls: a class processed by the ``valasp`` decorator, with a recursive annotation
+    :param value: the term to validate
+    :param fun: the function name of the terms of cls
+    :param arity: the arity of the terms of cls
+    :param index: the position of the recursive argument
+    :param nil: the name of the terminator
+    :return: an instance of cls, or None
+    """
+    state = _current_run_state.get(None)
+    memo = state.memo(cls) if state is not None else {}
+    chain = []
+    tail = None
+    while not (value.type == clingo.SymbolType.Function and value.name == nil and not value.arguments):
+        if value in memo:
+            tail = memo[value]
+            break
+        chain.append(value)
+        if value.type != clingo.SymbolType.Function or value.name != fun:
+            break
+        arguments = value.arguments
+        if len(arguments) != arity:
+            break
+        value = arguments[index]
+    for term in reversed(chain):
+        res = cls.__new__(cls)
+        res.valasp_init(term, tail)
+        memo[term] = tail = res
+    return tail
+
+
+@valasp_functools.lru_cache(maxsize=4096)
+def _valasp_compile(filename: str, source: str):
+    return compile(source, filename, "exec").co_consts[0]
 
 
 class Context:
@@ -26,30 +179,51 @@ class Context:
     at the end call the method ``run()`` to execute the ASP system.
     """
 
-    def __init__(self, wrap: List[Any] = None, max_arity: int = 16):
+    def __init__(self, wrap: List[Any] = None, max_arity: int = 16, lazy: bool = False):
         """Create a context object.
 
         If you have already a context object defining methods for @-terms used by your program, you can pass it in the wrap list.
         Similarly, if your @-terms are implemented by global functions, you can pass them in the wrap list.
 
+        If lazy is True, the program is grounded before adding validators, and only validators (and blacklist
+        constraints) for the signatures occurring in the ground program are added.
+        Validators are compiled on first use in any case.
+
         :param wrap: a list of objects and functions defining @-terms
         :param max_arity: the largest arity to be validated (16 is a reasonable upper bound)
+        :param lazy: if True, only validators for predicates occurring in the program are grounded
         """
         if not (1 <= max_arity <= 99):
             raise ValueError("max_arity must be in 1..99, but received {max_arity}")
 
         self.__wrap = list(wrap) if wrap else []
+        self.__pure: Dict[str, Callable] = {}
 
         self.__globals = {k: v for k, v in globals().items() if k[0:2] == '__' or k[0].islower()}
         self.__reserved = set(self.__globals.keys())
-        self.__validators: List[str] = []
+        self.__validators: List[Tuple[str, str, int, Optional[str]]] = []
+        self.__pending_terms: Dict[str, Tuple[str, List[str], List[str]]] = {}
+        self.__shapes: Dict[str, Tuple[int, Optional[str]]] = {}
         self.__classes: List[ClassVar] = []
+        self.__stateful: Set[str] = set()
+        self.__hooks: Dict[str, List[Tuple[type, Callable, bool]]] = {
+            prefix: [] for prefix in ('check', 'before_grounding', 'after_grounding')
+        }
 
         self.__max_arity = max_arity
+        self.__lazy = lazy
+        self.__last_state: Optional[RunState] = None
 
         self.__secret = object()
 
     def __getattr__(self, name):
+        pending = self.__dict__.get('_Context__pending_terms')
+        if pending and name in pending:
+            filename, args, body_lines = pending[name]
+            fun = self.valasp_make_fun(filename, name, args, body_lines)
+            setattr(self, name, fun)
+            return fun
+
         def method(*args):
             for wrap in self.__wrap:
                 if isinstance(wrap,Callable) and wrap.__name__ == name:
@@ -63,16 +237,58 @@ class Context:
 
         return method
 
-    def valasp(self, validate_predicate: bool = True, with_fun: Fun = Fun.FORWARD_IMPLICIT, auto_blacklist: bool = True):
+    def valasp_pure(self, fun: Callable = None, maxsize: int = 1024) -> Callable:
+        """Decorator to register a pure function as an @-term whose results are memoized.
+
+        Results are cached by argument tuple (clingo symbols are hashable), in a bounded LRU cache.
+        The decorated function takes precedence over any other @-term with the same name.
+        It can be used as ``@context.valasp_pure`` or ``@context.valasp_pure(maxsize=...)``, or called on a function.
+
+        :param fun: the function to memoize
+        :param maxsize: the maximum number of cached argument tuples (None for an unbounded cache)
+        :return: the memoized function, or a decorator if fun is None
+        """
+        def decorator(f: Callable) -> Callable:
+            if maxsize is not None and maxsize < 1:
+                raise ValueError(f"maxsize must be positive, but received {maxsize}")
+            res = valasp_functools.lru_cache(maxsize=maxsize)(f)
+            self.__wrap.insert(0, res)
+            self.__pure[res.__name__] = res
+            return res
+
+        if fun is None:
+            return decorator
+        return decorator(fun)
+
+    def valasp_pure_info(self) -> Dict[str, Any]:
+        """Return hit/miss statistics of memoized @-terms.
+
+        :return: a dictionary mapping names of pure @-terms to their ``cache_info()``
+        """
+        return {name: fun.cache_info() for name, fun in self.__pure.items()}
+
+    def valasp(self, validate_predicate: bool = True, with_fun: Fun = Fun.FORWARD_IMPLICIT, auto_blacklist: bool = True,
+               unique: Optional[List[str]] = None, nil: str = 'nil', table: bool = False):
         """Decorator to process classes for ASP validation.
 
         Annotations on a decorated class are used to define attributes and to inject an ``__init__()`` method.
         If the class defines a ``__post_init__()`` method, it is called at the end of the ``__init__()`` method.
         Other common magic methods are also injected, unless already defined in the class.
 
+        An annotation given by the name of the class itself (as a string) makes the class recursive, as for lists
+        encoded by terms like ``cons(1,cons(2,nil))``.
+        The recursive argument is either a term of the class or the constant nil, in which case the attribute is None.
+        Recursive arguments are validated iteratively (see :func:`valasp_build_tail`), and instances of recursive
+        classes are compared, hashed and printed by means of the original symbol, stored in ``valasp_symbol``.
+
         :param validate_predicate: True if the class is associated with a predicate in the ASP program
         :param with_fun: modality of initialization for instances of the class
         :param auto_blacklist: if True, predicates with the same name but different arities are blacklisted
+        :param unique: names of annotations forming a key, that is, no two atoms of the predicate can share their values
+        :param nil: the name of the constant terminating recursive classes
+        :param table: if True, validated atoms are stored in a columnar table of the run (see :meth:`valasp_table`)
+        :raise: ValueError if unique contains names that are not annotations, or unique or table are given but validate_predicate is False
+        :raise: TypeError if the class has more than one recursive annotation, or it is recursive with FORWARD
         :return: a decorator
         """
 
@@ -82,6 +298,17 @@ class Context:
             if not annotations:
                 raise TypeError('cannot process classes with no annotations')
             args = list(f'{a}' for a in annotations)
+            recursive = [a for a, typ in annotations.items() if typ == cls.__name__]
+            if len(recursive) > 1:
+                raise TypeError('cannot process classes with more than one recursive annotation')
+            if table and not validate_predicate:
+                raise ValueError('table requires validate_predicate')
+            if unique is not None:
+                if not validate_predicate:
+                    raise ValueError('unique requires validate_predicate')
+                for key in unique:
+                    if key not in annotations:
+                        raise ValueError(f'unique: {key} is not an annotation of {class_name}')
 
             def process_with_fun() -> Optional[str]:
                 nonlocal with_fun
@@ -128,11 +355,19 @@ class Context:
                     ]
 
                 def init_arg(arg: str, typ: ClassName) -> List[str]:
+                    if arg in recursive:
+                        return [f'self.{arg} = valasp_build_tail({class_name}, {arg}, "{with_fun_string}", '
+                                f'{len(args)}, {args.index(arg)}, "{nil}")']
                     if Type.is_primitive(typ):
                         return Type.get_primitive(typ).init_code(arg)
                     return [f'self.{arg} = {typ.__name__}({arg})']
 
+                if recursive and with_fun_string is None:
+                    raise TypeError('recursive classes cannot be initialized with FORWARD')
+
                 body = unpack(with_fun_string)
+                if recursive:
+                    body.append('self.valasp_symbol = value')
                 for k, v in annotations.items():
                     body.extend(init_arg(k, v))
 
@@ -150,15 +385,34 @@ class Context:
                     body.append('self.__post_init__()')
 
                 set_method('__init__', ['value'], body)
+                if recursive:
+                    tail = recursive[0]
+                    set_method('valasp_init', ['value', 'valasp_tail'], [
+                        f'self.{tail} = valasp_tail' if line.startswith(f'self.{tail} = valasp_build_tail(') else line
+                        for line in body
+                    ])
 
             def add_str() -> None:
                 if not has_method('__str__'):
-                    body = [f"return '{class_name}(' + " + " + ',' + ".join(f'str(self.{a})' for a in args) + " + ')'"]
+                    if recursive:
+                        body = ["return str(self.valasp_symbol)"]
+                    else:
+                        body = [f"return '{class_name}(' + " + " + ',' + ".join(f'str(self.{a})' for a in args) + " + ')'"]
                     set_method('__str__', [], body)
 
+            def add_hash() -> None:
+                if not has_method('__eq__') and not has_method('__hash__'):
+                    if recursive:
+                        set_method('__hash__', [], ["return hash(self.valasp_symbol)"])
+                    else:
+                        set_method('__hash__', [], ["return hash((" + ''.join(f'self.{a},' for a in args) + "))"])
+
             def add_cmp() -> None:
-                self_tuple = "(" + ','.join(f'self.{a}' for a in args) + ")"
-                other_tuple = "(" + ','.join(f'other.{a}' for a in args) + ")"
+                if recursive:
+                    self_tuple, other_tuple = 'self.valasp_symbol', 'other.valasp_symbol'
+                else:
+                    self_tuple = "(" + ','.join(f'self.{a}' for a in args) + ")"
+                    other_tuple = "(" + ','.join(f'other.{a}' for a in args) + ")"
                 methods = [('eq', '=='), ('ne', '!='), ('lt', '<'), ('le', '<='), ('ge', '>='), ('gt', '>')]
                 for m in methods:
                     if not has_method(f'__{m[0]}__'):
@@ -168,12 +422,31 @@ class Context:
                             f"return {self_tuple} {m[1]} {other_tuple}"
                         ])
 
+            def add_table() -> None:
+                def kind(typ) -> str:
+                    if Type.is_primitive(typ):
+                        primitive = Type.get_primitive(typ)
+                        if primitive is Integer:
+                            return INT
+                        if primitive is String or primitive is Alpha:
+                            return STR
+                    return OBJECT
+
+                cls.valasp_columns = {a: kind(typ) for a, typ in annotations.items()}
+                cls.valasp_table = classmethod(_valasp_table)
+
             with_fun_string = process_with_fun()
+            self.__shapes[class_name.to_predicate().value] = (len(args), with_fun_string)
             add_init()
             add_str()
+            add_hash()
             add_cmp()
+            if table:
+                add_table()
             if validate_predicate:
-                self.valasp_add_validator(class_name.to_predicate(), len(args), with_fun_string)
+                self.valasp_add_validator(class_name.to_predicate(), len(args), with_fun_string, unique, table)
+            if unique or table:
+                self.__stateful.add(class_name.to_predicate().value)
             if auto_blacklist:
                 self.valasp_blacklist(class_name.to_predicate(), self.valasp_all_arities_but(len(args)))
 
@@ -182,6 +455,28 @@ class Context:
         return decorator
 
 
+    def valasp_copy(self) -> 'Context':
+        """Return a copy of this context, sharing compiled classes, validators and @-terms.
+
+        The copy can be extended (for example, by registering more classes or @-terms) without affecting this context.
+
+        :return: a new context
+        """
+        res = Context.__new__(Context)
+        res.__dict__.update(self.__dict__)
+        res.__wrap = list(self.__wrap)
+        res.__pure = dict(self.__pure)
+        res.__globals = dict(self.__globals)
+        res.__reserved = set(self.__reserved)
+        res.__validators = list(self.__validators)
+        res.__pending_terms = dict(self.__pending_terms)
+        res.__shapes = dict(self.__shapes)
+        res.__classes = list(self.__classes)
+        res.__stateful = set(self.__stateful)
+        res.__hooks = {prefix: list(hooks) for prefix, hooks in self.__hooks.items()}
+        res.__last_state = None
+        return res
+
     def valasp_error(self, msg, args):
         raise TypeError(f"{msg}; args={args}")
 
@@ -205,6 +500,49 @@ class Context:
 
         return '\n'.join(res)
 
+    @staticmethod
+    def valasp_load(control: clingo.Control, filename: str, chunk_size: int = valasp_loaders.DEFAULT_CHUNK_SIZE) -> None:
+        """Load the given file in the base program of control.
+
+        Files compressed with gzip, bzip2 or xz (extensions .gz, .bz2 and .xz) are decompressed on the fly, and added
+        to control in chunks of complete statements (see :mod:`valasp.loaders`); the same for the standard input, denoted
+        by ``-``.
+
+        :param control: a controller
+        :param filename: the path of a (possibly compressed) file, or ``-`` for the standard input
+        :param chunk_size: the minimum number of characters added at once, for compressed files and the standard input
+        """
+        valasp_loaders.load(control, filename, chunk_size)
+
+    @staticmethod
+    def valasp_print_model(model: clingo.Model, stream: Any, prefix: str = 'Answer: ', suffix: str = '\n',
+                           buffer_size: int = 65536) -> None:
+        """Print the shown atoms of a model, separated by spaces, without materializing the model as a single string.
+
+        Atoms are written to the stream in chunks of about ``buffer_size`` characters.
+
+        :param model: a model
+        :param stream: a text stream
+        :param prefix: a string printed before the atoms
+        :param suffix: a string printed after the atoms
+        :param buffer_size: the number of characters to collect before writing on the stream
+        """
+        buffer = [prefix]
+        size = len(prefix)
+        separator = ''
+        for atom in model.symbols(shown=True):
+            atom = str(atom)
+            buffer.append(separator)
+            buffer.append(atom)
+            separator = ' '
+            size += len(atom) + 1
+            if size >= buffer_size:
+                stream.write(''.join(buffer))
+                buffer.clear()
+                size = 0
+        buffer.append(suffix)
+        stream.write(''.join(buffer))
+
     def valasp_make_fun(self, filename: str, name: str, args: List[str], body_lines: List[str], with_self: bool = False) -> Callable:
         """Return a function obtained by compiling the given code.
 
@@ -220,8 +558,23 @@ class Context:
         args = ('self, ' if with_self else '') + ','.join(args)
         sig = f"def {name.replace('.', '__')}({args}):"
         body = '\n    '.join(body_lines)
-        code = compile(f"{sig}\n    {body}", f"<valasp|{filename}|>", "exec")
-        return FunctionType(code.co_consts[0], self.__globals)
+        code = _valasp_compile(f"<valasp|{filename}|>", f"{sig}\n    {body}")
+        return FunctionType(code, self.__globals)
+
+    @staticmethod
+    def valasp_code_cache_info() -> Any:
+        """Return statistics of the process-wide cache of code objects used by :meth:`valasp_make_fun`.
+
+        Code objects are cached by filename and source, and shared by all contexts; only globals are rebound.
+
+        :return: a named tuple with fields hits, misses, maxsize and currsize
+        """
+        return _valasp_compile.cache_info()
+
+    @staticmethod
+    def valasp_code_cache_clear() -> None:
+        """Clear the process-wide cache of code objects used by :meth:`valasp_make_fun`."""
+        _valasp_compile.cache_clear()
 
     def valasp_register_class(self, other: ClassVar) -> None:
         """Add the given class to the context.
@@ -232,9 +585,29 @@ class Context:
         key = str(ClassName(other.__name__))
         if self.valasp_is_reserved(key):
             raise KeyError(f'{key} is reserved')
+        if 'valasp_state' not in other.__dict__:
+            other.valasp_state = classmethod(_valasp_state)
         self.__globals[key] = other
         self.__reserved.add(key)
         self.__classes.append(other)
+        for prefix, hooks in self.__hooks.items():
+            hooks.extend(self.__resolve_hooks(other, prefix))
+
+    @staticmethod
+    def __resolve_hooks(cls: ClassVar, prefix: str) -> List[Tuple[type, Callable, bool]]:
+        res = []
+        for method in valasp_inspect.getmembers(cls, predicate=valasp_inspect.ismethod):
+            if method[0].startswith(prefix):
+                m = getattr(cls, method[0])
+                params = list(valasp_inspect.signature(m).parameters)
+                if not params:
+                    res.append((cls, m, False))
+                elif params == ['state']:
+                    res.append((cls, m, True))
+                else:
+                    valasp_warnings.warn(f"ignore method {m.__name__} of class {cls.__name__} because it has parameters",
+                                         ValAspWarning)
+        return res
 
     def valasp_register_term(self, filename: str, name: PredicateName, args: List[str], body_lines: List[str], auth: Any = None) -> None:
         """Add the given @-term to the context.
@@ -258,39 +631,79 @@ class Context:
         """
         return (key in self.__reserved) or (auth != self.__secret and key.lower().startswith('valasp'))
 
-    def valasp_add_validator(self, predicate: PredicateName, arity: int, fun: Optional[str] = None) -> None:
+    def valasp_add_validator(self, predicate: PredicateName, arity: int, fun: Optional[str] = None,
+                             unique: Optional[List[str]] = None, table: bool = False) -> None:
         """Add a constraint validator for the given predicate name.
 
         The constraint validator is paired with an @-term, which in turn calls the constructor of the associated class name.
+        The @-term is compiled the first time it is used.
+
+        If unique is given, the @-term also maintains an index from keys to atoms in the run state of the class, and
+        rejects atoms whose key is already associated with a different atom.
 
         :param predicate: a predicate name to be validated
         :param arity: the arity of the predicate
         :param fun: the function name expected by the constructor of the associated class name, or None if the constructor expects a single value
+        :param unique: the names of the attributes forming a key, or None
+        :param table: if True, the instance is added to the table of the class in the run state
         """
-        args_as_vars = ','.join(f'X{i}' for i in range(arity))
         at_term = f'valasp_validate_{predicate}'
-        constraint = f':- {predicate}({args_as_vars}); '
-        if fun is None:
-            constraint += f'@{at_term}({args_as_vars}) != 1.'
-        elif fun is '':
-            constraint += f'@{at_term}(({args_as_vars},)) != 1.'
+        if self.valasp_is_reserved(at_term, self.__secret):
+            raise KeyError(f'{at_term} is reserved')
+        self.__validators.append(('validate', predicate.value, arity, fun))
+        if unique or table:
+            check = [f'    obj = {predicate.to_class()}(value)']
         else:
-            constraint += f'@{at_term}({fun}({args_as_vars})) != 1.'
-        self.__validators.append(constraint)
-        self.valasp_register_term(f'Invalid instance of {predicate}:', PredicateName(at_term), ['value'], [
-            f'try:'
-            f'    {predicate.to_class()}(value)',
+            check = [f'    {predicate.to_class()}(value)']
+        if unique:
+            key = '(' + ''.join(f'obj.{k},' for k in unique) + ')'
+            key_str = ', '.join(f'{k}={{obj.{k}}}' for k in unique)
+            check.extend([
+                f"    other = {predicate.to_class()}.valasp_state().__dict__.setdefault('valasp_unique', {{}}).setdefault({key}, value)",
+                f'    if other != value:',
+                f'        raise ValueError(f"duplicate key {key_str}, already used by {{other}}")',
+            ])
+        if table:
+            check.append(f'    {predicate.to_class()}.valasp_table().append(obj)')
+        self.__pending_terms[at_term] = (f'Invalid instance of {predicate}:', ['value'], [
+            f'if value in valasp_injected({predicate.to_class()}):',
+            f'    return 1',
+            f'try:',
+            *check,
             f'except Exception as e:',
             f'    raise ValueError(f"{{e}} in atom {{value}}").with_traceback(e.__traceback__.tb_next) from None',
             f'return 1'
-        ], auth=self.__secret)
+        ])
 
-    def valasp_validators(self) -> str:
+    def valasp_validators(self, signatures: Optional[Set[Tuple[str, int]]] = None) -> str:
         """Return a string with all constraint validators.
 
+        If signatures are given, only constraints for the given signatures are returned, and the rules preventing
+        warnings on undefined blacklisted predicates are omitted (because the program is expected to be already grounded).
+
+        :param signatures: a set of pairs (predicate name, arity), or None for all validators
         :return: constraints in a string
         """
-        return '\n'.join(self.__validators)
+        res = []
+        for kind, predicate, arity, fun in self.__validators:
+            if signatures is not None and (predicate, arity) not in signatures:
+                continue
+            args_as_vars = ','.join(f'X{i}' for i in range(arity))
+            if kind == 'validate':
+                at_term = f'valasp_validate_{predicate}'
+                if fun is None:
+                    res.append(f':- {predicate}({args_as_vars}); @{at_term}({args_as_vars}) != 1.')
+                elif fun == '':
+                    res.append(f':- {predicate}({args_as_vars}); @{at_term}(({args_as_vars},)) != 1.')
+                else:
+                    res.append(f':- {predicate}({args_as_vars}); @{at_term}({fun}({args_as_vars})) != 1.')
+            else:
+                assert kind == 'blacklist'
+                res.append(f':- {predicate}({args_as_vars}); '
+                           f'@valasp_error("{predicate}/{arity} is blacklisted", ({args_as_vars},)) == 1.')
+                if signatures is None:
+                    res.append(f'{predicate}({args_as_vars}) :- {predicate}({args_as_vars}).')
+        return '\n'.join(res)
 
     def valasp_blacklist(self, predicate: PredicateName, arities: List[int] = None) -> None:
         """Add the given predicate name to the blacklist, for all provided arities.
@@ -303,13 +716,7 @@ class Context:
         for arity in arities:
             if not (1 <= arity <= self.__max_arity):
                 raise ValueError(f"arities must be in 1..{self.__max_arity}")
-
-            args_as_vars = ','.join(f'X{i}' for i in range(arity))
-            self.__validators.append(
-                f':- {predicate}({args_as_vars}); '
-                f'@valasp_error("{predicate}/{arity} is blacklisted", ({args_as_vars},)) == 1.\n'
-                f'{predicate}({args_as_vars}) :- {predicate}({args_as_vars}).'
-            )
+            self.__validators.append(('blacklist', predicate.value, arity, None))
 
     def valasp_all_arities_but(self, excluded: int) -> List[int]:
         """Return a list of all arities but ``excluded``.
@@ -319,73 +726,402 @@ class Context:
         """
         return [x+1 for x in range(self.__max_arity) if x+1 != excluded]
 
-    def valasp_run_grounder(self, base_program: List[str]) -> clingo.Control:
+    def valasp_run_grounder(self, base_program: List[str], control_args: List[str] = None) -> clingo.Control:
         """Run grounder for the given ASP code, including all validators.
 
         :param base_program: ASP code
+        :param control_args: command line arguments for clingo (for example, ``['-t', '4']``)
         :return: the resulting controller
         """
-        control = clingo.Control()
-        control.add("base", [], '\n'.join(base_program + [self.valasp_validators()]))
-        control.ground([("base", [])], context=self)
+        control = clingo.Control(control_args or [])
+        if self.__lazy:
+            control.add("base", [], '\n'.join(base_program))
+            control.ground([("base", [])], context=self)
+            control.add("valasp", [], self.valasp_validators(self.__signatures(control)))
+            control.ground([("valasp", [])], context=self)
+        else:
+            control.add("base", [], '\n'.join(base_program + [self.valasp_validators()]))
+            control.ground([("base", [])], context=self)
         return control
 
-    def valasp_run_class_methods(self, prefix: str = 'check') -> None:
-        """Crawl all class methods with a given prefix, and a call them.
+    @staticmethod
+    def __signatures(control: clingo.Control) -> Set[Tuple[str, int]]:
+        # noinspection PyUnresolvedReferences
+        return set((signature[0], signature[1]) for signature in control.symbolic_atoms.signatures)
+
+    def valasp_run_class_methods(self, prefix: str = 'check', state: RunState = None) -> None:
+        """Call all class methods with a given prefix.
+
+        Methods with a single parameter named ``state`` receive the namespace of their class in the run state.
+        Methods for the prefixes ``check``, ``before_grounding`` and ``after_grounding`` are resolved when classes are
+        registered, and methods with other parameters are ignored with a warning at that time.
+        Methods for other prefixes are resolved on first use.
 
         :param prefix: a string
+        :param state: the state of the run, or None for the current one
         """
-        for cls in self.__classes:
-            for method in valasp_inspect.getmembers(cls, predicate=valasp_inspect.ismethod):
-                if method[0].startswith(f'{prefix}'):
-                    m = getattr(cls, method[0])
-                    if len(valasp_inspect.signature(m).parameters) != 0:
-                        valasp_warnings.warn(f"ignore method {m.__name__} of class {cls.__name__} because it has parameters",
-                                      ValAspWarning)
-                    else:
-                        m()
-
-    def valasp_run_solver(self, base_program: List[str]) -> Optional[List[clingo.SymbolicAtom]]:
+        if state is None:
+            state = RunState.current()
+        hooks = self.__hooks.get(prefix)
+        if hooks is None:
+            hooks = [hook for cls in self.__classes for hook in self.__resolve_hooks(cls, prefix)]
+            self.__hooks[prefix] = hooks
+        for cls, m, with_state in hooks:
+            if with_state:
+                m(state.of(cls))
+            else:
+                m()
+
+    def valasp_run_solver(self, base_program: List[str], control_args: List[str] = None) -> Optional[List[clingo.SymbolicAtom]]:
         """Run solver on the given ASP program, including all validators.
 
         :param base_program: ASP code
-        :return: a model, or None if the program is inconsistent
+        :param control_args: command line arguments for clingo (for example, ``['-t', '4']``)
+        :return: the last computed model, or None if the program is inconsistent
         """
-        control = self.valasp_run_grounder(base_program)
-        self.valasp_run_class_methods()
         res = None
 
         def on_model(model):
             nonlocal res
-            res = []
-            for atom in model.symbols(atoms=True):
-                res.append(atom)
+            res = model.symbols(atoms=True)
 
-        # noinspection PyUnresolvedReferences
-        control.solve(on_model=on_model)
+        with RunState().activate() as state:
+            self.__last_state = state
+            control = self.valasp_run_grounder(base_program, control_args)
+            self.valasp_run_class_methods()
+            # noinspection PyUnresolvedReferences
+            control.solve(on_model=on_model)
         return res
 
+    def valasp_table(self, cls: ClassVar, state: RunState = None) -> Table:
+        """Return the table of the atoms of the given class validated in a run.
+
+        :param cls: a class processed by the ``valasp`` decorator with ``table=True``
+        :param state: the state of a run, or None for the last run of this context
+        :raise: ValueError if cls has no table, or if there is no run
+        :return: a table
+        """
+        if 'valasp_columns' not in cls.__dict__:
+            raise ValueError(f'{cls.__name__} has no table; use table=True in the valasp decorator')
+        if state is None:
+            state = self.__last_state
+            if state is None:
+                raise ValueError('no run to take the table from')
+        return state.table(cls)
+
+    def valasp_output_validator(self, predicates: List[PredicateName] = None) -> 'ModelValidator':
+        """Return a validator for the shown atoms of models.
+
+        Shown atoms are validated by the classes processed by the ``valasp`` decorator, even if they are not associated
+        with a validator for the grounding phase (i.e., if ``validate_predicate`` is False).
+
+        :param predicates: the predicates to validate, or None for the predicates of all classes processed by the ``valasp`` decorator
+        :raise: ValueError if some of the given predicates is not associated with a class
+        :return: a model validator
+        """
+        targets = self.__shapes
+        if predicates is not None:
+            predicates = [str(predicate) for predicate in predicates]
+            missing = [predicate for predicate in predicates if predicate not in targets]
+            if missing:
+                raise ValueError(f"cannot validate output of {', '.join(missing)}: no class")
+            targets = {predicate: targets[predicate] for predicate in predicates}
+        return ModelValidator({
+            (predicate, arity): (self.__globals[str(PredicateName(predicate).to_class())], fun)
+            for predicate, (arity, fun) in targets.items()
+        })
+
+    def valasp_class(self, predicate: PredicateName) -> ClassVar:
+        """Return the class processed by the ``valasp`` decorator for the given predicate.
+
+        :param predicate: the name of a predicate
+        :raise: ValueError if the predicate is not associated with a class
+        :return: a class
+        """
+        predicate = str(predicate)
+        if predicate not in self.__shapes:
+            raise ValueError(f"no class for predicate {predicate}")
+        return self.__globals[str(PredicateName(predicate).to_class())]
+
+    def valasp_add_facts(self, control: clingo.Control, cls: ClassVar, rows: Iterable[Any]) -> int:
+        """Validate the given rows and add them as facts of the predicate of cls, by means of the backend of control.
+
+        Rows are either atoms (clingo symbols), or tuples with an element for each annotation of cls.
+        Elements of tuples can be clingo symbols, or Python values: int are mapped to numbers, str to strings, and
+        tuples to tuples. Strings for primitive annotations are first parsed by the primitive type; hence, for example,
+        ``'12'`` is mapped to a number for Integer annotations, and ``'bob'`` to a constant for Alpha annotations.
+        Each row is validated as by the validator of the predicate (or by the constructor of cls, if the predicate is
+        not validated), and recorded in the current run, so that the validator skips it while grounding.
+        Hence, this method must be called during a run, typically by means of the ``facts`` parameter of
+        :meth:`valasp_run`, after ``before_grounding*`` class methods are called.
+
+        :param control: a controller
+        :param cls: a class processed by the ``valasp`` decorator
+        :param rows: atoms or tuples of arguments
+        :raise: ValueError if no run is active, cls is not associated with a predicate, or some row is invalid
+        :return: the number of added facts
+        """
+        predicate = ClassName(cls.__name__).to_predicate().value
+        if predicate not in self.__shapes or self.__globals.get(cls.__name__) is not cls:
+            raise ValueError(f"cannot add facts of {cls.__name__}: not processed by the valasp decorator")
+        arity, fun = self.__shapes[predicate]
+        validate = self.__validator_of(cls, predicate)
+        primitives = [Type.get_primitive(typ) if Type.is_primitive(typ) else None for typ in cls.__annotations__.values()]
+        injected = _valasp_active_state('valasp_add_facts').injected(cls)
+
+        def to_symbol(value, primitive=None):
+            if isinstance(value, clingo.Symbol):
+                return value
+            if isinstance(value, str) and primitive is not None:
+                value = primitive.parse(value)
+                if primitive is Alpha:
+                    return clingo.Function(value)
+            if isinstance(value, bool):
+                raise ValueError(f"cannot map {value} to a symbol")
+            if isinstance(value, int):
+                return clingo.Number(value)
+            if isinstance(value, str):
+                return clingo.String(value)
+            if isinstance(value, tuple):
+                return clingo.Function('', [to_symbol(v) for v in value])
+            raise ValueError(f"cannot map {value} to a symbol")
+
+        count = 0
+        with control.backend() as backend:
+            for row in rows:
+                if isinstance(row, clingo.Symbol):
+                    if row.type != clingo.SymbolType.Function or row.name != predicate or len(row.arguments) != arity:
+                        raise ValueError(f"expecting atom of {predicate}/{arity}, but received {row}")
+                    args = row.arguments
+                else:
+                    if len(row) != arity:
+                        raise ValueError(f"expecting {arity} values for {predicate}, but received {row}")
+                    args = [to_symbol(value, primitive) for value, primitive in zip(row, primitives)]
+                value = args[0] if fun is None else clingo.Function(fun, args)
+                if value not in injected:
+                    validate(value)
+                    injected.add(value)
+                backend.add_rule([backend.add_atom(clingo.Function(predicate, args))])
+                count += 1
+        return count
+
+    def __validator_of(self, cls: ClassVar, predicate: str) -> Callable:
+        if any(kind == 'validate' and p == predicate for kind, p, _, _ in self.__validators):
+            return getattr(self, f'valasp_validate_{predicate}')
+        return cls
+
+    def __term_of(self, atom: clingo.Symbol) -> Optional[clingo.Symbol]:
+        shape = self.__shapes.get(atom.name)
+        if shape is None or shape[0] != len(atom.arguments) or not any(
+                kind == 'validate' and p == atom.name for kind, p, _, _ in self.__validators):
+            return None
+        fun = shape[1]
+        return atom.arguments[0] if fun is None else clingo.Function(fun, atom.arguments)
+
+    def valasp_add_snapshot(self, control: clingo.Control, filename: str, key: str = '') -> None:
+        """Add the facts of the given snapshot to the base program of control.
+
+        The validated terms stored in the snapshot are recorded in the current run, so that validators return
+        immediately on the atoms of the snapshot.
+        Terms of classes whose instances are recorded in the run state (i.e., with ``unique`` keys, a table, or
+        ``before_grounding*`` and ``after_grounding*`` class methods) are instantiated anyway, so that checks involving
+        other atoms are still performed.
+        As for :meth:`valasp_add_facts`, this method must be called during a run (see the ``snapshots`` parameter of
+        :meth:`valasp_run`).
+
+        :param control: a controller
+        :param filename: the path of a snapshot (see :meth:`valasp_save_snapshot`)
+        :param key: the key of the current specification
+        :raise: ValueError if no run is active, or the file is not a snapshot of the given key
+        """
+        state = _valasp_active_state('valasp_add_snapshot')
+        atoms, terms = valasp_snapshots.load(filename, key)
+        with_hooks = {cls for prefix in ('before_grounding', 'after_grounding') for cls, _, _ in self.__hooks[prefix]}
+        for predicate, values in terms.items():
+            cls = self.valasp_class(PredicateName(predicate))
+            injected = state.injected(cls)
+            if predicate in self.__stateful or cls in with_hooks:
+                validate = self.__validator_of(cls, predicate)
+                for value in values:
+                    if value not in injected:
+                        validate(value)
+                        injected.add(value)
+            else:
+                injected.update(values)
+        with control.backend() as backend:
+            for atom in atoms:
+                backend.add_rule([backend.add_atom(atom)])
+
+    def valasp_save_snapshot(self, control: clingo.Control, filename: str, key: str = '') -> int:
+        """Save the facts of validated predicates in the ground program of control in a snapshot.
+
+        Other facts (for example, facts derived by an encoding) are not saved, so that the snapshot can be used with
+        other encodings; as they cannot be distinguished from facts of the instance, a warning lists their predicates,
+        whose facts must be given again to runs loading the snapshot if they are part of the instance.
+        The snapshot is expected to be saved after validation (for example, in the ``on_validation_done`` callback of
+        :meth:`valasp_run`), and to be loaded by :meth:`valasp_add_snapshot`.
+
+        :param control: a grounded controller
+        :param filename: the path of the snapshot
+        :param key: the key of the specification used to validate the facts
+        :return: the number of saved facts
+        """
+        atoms = []
+        terms: Dict[str, List[clingo.Symbol]] = {}
+        skipped = set()
+        for atom in control.symbolic_atoms:
+            if atom.is_fact:
+                term = self.__term_of(atom.symbol)
+                if term is not None:
+                    atoms.append(atom.symbol)
+                    terms.setdefault(atom.symbol.name, []).append(term)
+                else:
+                    skipped.add(f'{atom.symbol.name}/{len(atom.symbol.arguments)}')
+        if skipped:
+            valasp_warnings.warn(f"facts of {', '.join(sorted(skipped))} are not validated, and not saved in {filename}",
+                                 ValAspWarning)
+        valasp_snapshots.save(filename, atoms, terms, key)
+        return len(atoms)
+
     def valasp_run(self, control: clingo.Control, on_validation_done: Callable = None, on_model: Callable = None,
-                   aux_program: List[str] = None, with_validators: bool = True, with_solve: bool = True) -> None:
+                   aux_program: List[str] = None, with_validators: bool = True, with_solve: bool = True,
+                   output_validator: 'ModelValidator' = None, facts: Dict[Any, Iterable[Any]] = None,
+                   snapshots: List[str] = None, snapshot_key: str = '') -> RunState:
         """Run grounder on the given controller, possibly performing validation and searching for a model.
 
+        The state of the run is returned, and also kept as the state of the last run (see :meth:`valasp_table`).
+
         :param control: a controller
         :param on_validation_done: a function invoked after grounding, if no validation error is reported
         :param on_model: a callback function to process a model
         :param aux_program: more ASP code to add to the program
         :param with_validators: if True, validator constraints are added, and ``before_grounding*`` and ``after_grounding*`` class methods are called
         :param with_solve: if True, a model is searched
+        :param output_validator: if given, models are validated before being passed to on_model, and the search stops at the first invalid model
+        :param facts: a dictionary mapping classes to rows, to be added as facts (see :meth:`valasp_add_facts`)
+        :param snapshots: paths of snapshots, whose facts are added as already validated (see :meth:`valasp_add_snapshot`)
+        :param snapshot_key: the key of the current specification, to be matched by snapshots
+        :return: the state of the run
         """
-        if with_validators:
-            control.add("valasp", [], self.valasp_validators())
-            self.valasp_run_class_methods('before_grounding')
-        if aux_program:
-            control.add("aux_program", [], '\n'.join(aux_program))
-        control.ground([("base", []), ("valasp", []), ("aux_program", [])], context=self)
-        if with_validators:
-            self.valasp_run_class_methods('after_grounding')
-        if on_validation_done:
-            on_validation_done()
-        if with_solve:
-            # noinspection PyUnresolvedReferences
-            control.solve(on_model=on_model)
+        with RunState().activate() as state:
+            self.__last_state = state
+            if with_validators:
+                if not self.__lazy:
+                    control.add("valasp", [], self.valasp_validators())
+                self.valasp_run_class_methods('before_grounding', state)
+            if facts:
+                for cls, rows in facts.items():
+                    self.valasp_add_facts(control, cls, rows)
+            for snapshot in snapshots or []:
+                self.valasp_add_snapshot(control, snapshot, snapshot_key)
+            if aux_program:
+                control.add("aux_program", [], '\n'.join(aux_program))
+            if with_validators and self.__lazy:
+                control.ground([("base", []), ("aux_program", [])], context=self)
+                control.add("valasp", [], self.valasp_validators(self.__signatures(control)))
+                control.ground([("valasp", [])], context=self)
+            else:
+                control.ground([("base", []), ("valasp", []), ("aux_program", [])], context=self)
+            if with_validators:
+                self.valasp_run_class_methods('after_grounding', state)
+            if on_validation_done:
+                on_validation_done()
+            if with_solve:
+                if output_validator is None:
+                    # noinspection PyUnresolvedReferences
+                    control.solve(on_model=on_model)
+                    return state
+                error = None
+
+                def validate_and_forward(model):
+                    nonlocal error
+                    try:
+                        output_validator(model)
+                    except ValueError as e:
+                        error = e.with_traceback(None)
+                        return False
+                    return on_model(model) if on_model else True
+
+                # noinspection PyUnresolvedReferences
+                control.solve(on_model=validate_and_forward)
+                if error is not None:
+                    try:
+                        raise error
+                    finally:
+                        error = None
+        return state
+
+
+class ModelValidator:
+    """Validator of the shown atoms of models.
+
+    Consecutive models usually share most of their atoms, and therefore atoms are checked only the first time they are
+    shown: a set of already seen symbols is kept by the validator.
+    Instances are obtained by :meth:`Context.valasp_output_validator`.
+    """
+
+    def __init__(self, classes: Dict[Tuple[str, int], Tuple[type, Optional[str]]]):
+        """Create a model validator.
+
+        :param classes: a dictionary mapping signatures to classes and to the function name expected by their constructor
+        """
+        self.__classes = classes
+        self.__seen: Set[clingo.Symbol] = set()
+
+    def __call__(self, model: clingo.Model) -> None:
+        """Validate the shown atoms of the given model that were not shown by previous models.
+
+        :param model: a model
+        :raise: ValueError if some atom is invalid
+        """
+        seen = self.__seen
+        for atom in model.symbols(shown=True):
+            if atom in seen:
+                continue
+            if atom.type == clingo.SymbolType.Function:
+                target = self.__classes.get((atom.name, len(atom.arguments)))
+                if target is not None:
+                    cls, fun = target
+                    try:
+                        if fun is None:
+                            cls(atom.arguments[0])
+                        elif fun == '':
+                            cls(clingo.Function('', atom.arguments))
+                        else:
+                            cls(atom)
+                    except Exception as e:
+                        raise ValueError(f"invalid output: {e} in atom {atom}") from None
+            seen.add(atom)
+
+    def seen(self) -> int:
+        """Return the number of distinct atoms checked so far.
+
+        :return: the number of seen atoms
+        """
+        return len(self.__seen)
+
+
+class ContextTemplate:
+    """A context built once, and instantiated cheaply for each run.
+
+    Building a context amounts to decorate classes, which in turn compiles their methods and validators.
+    A template does it once, and each call to :meth:`instantiate` returns a copy of the built context.
+    """
+
+    def __init__(self, build: Callable[[Context], None], wrap: List[Any] = None, max_arity: int = 16, lazy: bool = False):
+        """Create a template by building a context.
+
+        :param build: a function registering classes and @-terms in the given context
+        :param wrap: a list of objects and functions defining @-terms (see :class:`Context`)
+        :param max_arity: the largest arity to be validated (see :class:`Context`)
+        :param lazy: if True, only validators for predicates occurring in the program are grounded (see :class:`Context`)
+        """
+        self.__context = Context(wrap=wrap, max_arity=max_arity, lazy=lazy)
+        build(self.__context)
+
+    def instantiate(self) -> Context:
+        """Return a context for a new run.
+
+        :return: a copy of the built context
+        """
+        return self.__context.valasp_copy()
@@ -4,13 +4,15 @@
 """The enum :class:`Fun` and the primitive types are defined in this module.
 
 The primitive types are markers to be used in annotations. They cannot be instantiated, and offer a very limited set of utility function.
+
+This module does not import ``clingo`` at load time, so that specifications can be processed without loading the ASP system.
+The ``clingo`` types are recognized as primitive types the first time a primitive type is looked up.
 """
 
 from dataclasses import dataclass
 from enum import Enum
 from typing import List, ClassVar
 
-import clingo
 import typing
 
 from valasp.domain.names import PredicateName
@@ -38,6 +40,7 @@ class Type:
     This class cannot be instantiated, and its subclasses are expected to satisfy this invariant.
     """
     __primitives = None
+    __with_clingo_aliases = False
 
     def __init__(self):
         raise NotImplemented('this class must be used only as a marker')
@@ -63,7 +66,7 @@ class Type:
         :param typ: a type
         :return: true if typ is a primitive type
         """
-        return typ in cls.__primitives
+        return typ in cls.__get_primitives()
 
     @classmethod
     def get_primitive(cls, typ: ClassVar) -> 'Type':
@@ -73,7 +76,15 @@ class Type:
         :raise: KeyError if Type.is_primitive(typ) != True
         :return: a subclass of Type associated with typ
         """
-        return cls.__primitives[typ]
+        return cls.__get_primitives()[typ]
+
+    @classmethod
+    def __get_primitives(cls) -> dict:
+        if not Type.__with_clingo_aliases:
+            import clingo
+            Type.__primitives = {**Type.__primitives, clingo.Number: Integer, clingo.String: String}
+            Type.__with_clingo_aliases = True
+        return Type.__primitives
 
     @classmethod
     def set_primitives(cls, value) -> None:
@@ -213,6 +224,87 @@ class Alpha(Type):
         return PredicateName(value).value
 
 
+@dataclass(frozen=True)
+class Date(Type):
+    """Primitive type representing calendar dates, given as tuples (year,month,day).
+
+    Dates are validated arithmetically against a table of month lengths, and stored as Python tuples.
+    Years are in the range 1..9999, as for :class:`datetime.date`.
+
+    This class cannot be instantiated.
+    """
+    DAYS_IN_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+    MIN_YEAR = 1
+    MAX_YEAR = 9999
+
+    def __init__(self):
+        super().__init__()
+
+    @classmethod
+    def init_code(cls, arg: str) -> List[str]:
+        # arguments are read once and unpacked in locals, as each access to .arguments builds a new list of symbols
+        args, y, m, d = (f'valasp_{arg}_{suffix}' for suffix in ('arguments', 'year', 'month', 'day'))
+        return super().init_code(arg) + [
+            f'{args} = {arg}.arguments if {arg}.type == clingo.SymbolType.Function and not {arg}.name else ()',
+            f'if len({args}) != 3:',
+            f'    raise TypeError(f"expecting date (year,month,day), but received {{{arg}}}")',
+            f'{y}, {m}, {d} = {args}',
+            f'if {y}.type != clingo.SymbolType.Number or {m}.type != clingo.SymbolType.Number or {d}.type != clingo.SymbolType.Number:',
+            f'    raise TypeError(f"expecting date (year,month,day) of integers, but received {{{arg}}}")',
+            f'{y}, {m}, {d} = {y}.number, {m}.number, {d}.number',
+            f'if not({cls.MIN_YEAR} <= {y} <= {cls.MAX_YEAR}) or not(1 <= {m} <= 12) or not(1 <= {d} <= {cls.DAYS_IN_MONTH}[{m}] + ({m} == 2 and {y} % 4 == 0 and ({y} % 100 != 0 or {y} % 400 == 0))):',
+            f'    raise ValueError(f"invalid date {{{arg}}}")',
+            f'self.{arg} = ({y}, {m}, {d})',
+        ]
+
+    @classmethod
+    def is_leap(cls, year: int) -> bool:
+        """Return true if year is a leap year of the Gregorian calendar.
+
+        :param year: a year
+        :return: true if year is a leap year
+        """
+        return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+    @classmethod
+    def days_in_month(cls, year: int, month: int) -> int:
+        """Return the number of days of the given month.
+
+        :param year: a year
+        :param month: a month in 1..12
+        :return: the number of days in month
+        """
+        return cls.DAYS_IN_MONTH[month] + (month == 2 and cls.is_leap(year))
+
+    @classmethod
+    def is_valid(cls, year: int, month: int, day: int) -> bool:
+        """Return true if (year,month,day) is a valid date.
+
+        :param year: a year
+        :param month: a month
+        :param day: a day
+        :return: true if the date is valid
+        """
+        return cls.MIN_YEAR <= year <= cls.MAX_YEAR and 1 <= month <= 12 and 1 <= day <= cls.days_in_month(year, month)
+
+    @classmethod
+    def parse(cls, value: str) -> tuple:
+        """Return the tuple (year,month,day) represented in value, in the format YYYY-MM-DD.
+
+        :param value: a string to be parsed
+        :raise: ValueError if value is not a valid date, or TypeError if its type is not str
+        :return: the date in value
+        """
+        value = super().parse(value)
+        parts = value.split('-')
+        if len(parts) != 3 or not all(p.isdigit() for p in parts):
+            raise ValueError(f"expecting date in the format YYYY-MM-DD, but found {value}")
+        res = tuple(int(p) for p in parts)
+        if not cls.is_valid(*res):
+            raise ValueError(f"invalid date {value}")
+        return res
+
+
 @dataclass(frozen=True)
 class Any(Type):
     """Primitive type representing wildcards.
@@ -240,14 +332,14 @@ class Any(Type):
 Type.set_primitives({
     Integer: Integer,
     int: Integer,
-    clingo.Number: Integer,
 
     String: String,
     str: String,
-    clingo.String: String,
 
     Alpha: Alpha,
 
+    Date: Date,
+
     Any: Any,
     typing.Any: Any,
 })
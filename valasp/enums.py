@@ -0,0 +1,33 @@
+# This file is part of ValAsp which is released under the Apache License, Version 2.0.
+# See file README.md for full license details.
+
+"""Enumerations stored in external files, with one value per line, are loaded by this module.
+
+Each file is read the first time it is needed, and the resulting set is shared by all classes and runs of the process.
+"""
+
+import functools
+from typing import FrozenSet, Union
+
+
+@functools.lru_cache(maxsize=None)
+def load_enum(filename: str, typ: str) -> FrozenSet[Union[int, str]]:
+    """Return the set of values in the given file.
+
+    Lines are stripped of the line terminator, and empty lines are ignored.
+
+    :param filename: the path of a text file
+    :param typ: one of Integer, String and Alpha
+    :raise: ValueError if typ is Integer and some line is not an integer
+    :return: the set of values in the file
+    """
+    with open(filename, encoding='utf-8') as f:
+        values = (line.rstrip('\r\n') for line in f)
+        if typ == 'Integer':
+            return frozenset(int(value) for value in values if value.strip())
+        return frozenset(value for value in values if value)
+
+
+def clear_cache() -> None:
+    """Forget the loaded files, so that they are read again when needed."""
+    load_enum.cache_clear()
@@ -0,0 +1,94 @@
+# This file is part of ValAsp which is released under the Apache License, Version 2.0.
+# See file README.md for full license details.
+
+"""Algorithms on graphs given as lists of edges, used to validate the structure of binary relations.
+
+All algorithms are iterative, so that large instances do not hit the recursion limit of Python.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+_END = object()
+
+
+def adjacency(edges: Iterable[Tuple[Any, Any]]) -> Dict[Any, List[Any]]:
+    """Return the adjacency lists of the directed graph with the given edges.
+
+    :param edges: pairs (source, destination)
+    :return: a dictionary mapping every node to the list of its successors
+    """
+    res = {}
+    for source, dest in edges:
+        res.setdefault(source, []).append(dest)
+        res.setdefault(dest, [])
+    return res
+
+
+def find_cycle(edges: Iterable[Tuple[Any, Any]]) -> Optional[List[Any]]:
+    """Return a cycle of the directed graph with the given edges, or None if the graph is acyclic.
+
+    The cycle is found by a depth-first search, and it is given as a list of nodes whose first and last elements coincide.
+
+    :param edges: pairs (source, destination)
+    :return: a witness cycle, or None
+    """
+    graph = adjacency(edges)
+    on_stack = {}
+    done = set()
+    for root in graph:
+        if root in done:
+            continue
+        path = [root]
+        on_stack[root] = 0
+        iterators = [iter(graph[root])]
+        while iterators:
+            node = next(iterators[-1], _END)
+            if node is _END:
+                iterators.pop()
+                done.add(path[-1])
+                del on_stack[path.pop()]
+            elif node in on_stack:
+                return path[on_stack[node]:] + [node]
+            elif node not in done:
+                on_stack[node] = len(path)
+                path.append(node)
+                iterators.append(iter(graph[node]))
+    return None
+
+
+def find_disconnected(edges: Iterable[Tuple[Any, Any]]) -> Optional[Tuple[Any, Any]]:
+    """Return two nodes in different components of the undirected graph with the given edges, or None if it is connected.
+
+    Components are computed by union-find, with path halving and union by size.
+
+    :param edges: pairs of nodes
+    :return: a pair of disconnected nodes, or None
+    """
+    parent = {}
+    size = {}
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for a, b in edges:
+        for node in (a, b):
+            if node not in parent:
+                parent[node] = node
+                size[node] = 1
+        a, b = find(a), find(b)
+        if a != b:
+            if size[a] < size[b]:
+                a, b = b, a
+            parent[b] = a
+            size[a] += size[b]
+
+    first = None
+    for node in parent:
+        if first is None:
+            first = node
+        elif find(node) != find(first):
+            return first, node
+    return None
@@ -0,0 +1,152 @@
+# This file is part of ValAsp which is released under the Apache License, Version 2.0.
+# See file README.md for full license details.
+
+"""ASP programs are loaded by this module, possibly from compressed files or from the standard input.
+
+Plain files are loaded by clingo.
+Files compressed with gzip, bzip2 or xz (recognized by the extensions .gz, .bz2 and .xz) are decompressed on the fly,
+and their content is added to the controller in chunks that end at statement boundaries, so that no decompressed copy
+is written to disk and memory usage is bounded by the size of the chunks.
+The standard input, denoted by ``-``, is processed in the same way, so that programs produced by other processes can
+be added while they are still being written.
+
+Directives ``#include`` in compressed files are resolved with respect to the working directory, as the content is not
+associated with a file.
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+import sys
+from typing import Iterable, Iterator, TextIO
+
+import clingo
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+_OPENERS = {
+    '.gz': gzip.open,
+    '.bz2': bz2.open,
+    '.xz': lzma.open,
+}
+
+
+def is_compressed(filename: str) -> bool:
+    """Return true if the given file is compressed, according to its extension.
+
+    :param filename: the path of a file
+    :return: true if the extension is .gz, .bz2 or .xz
+    """
+    return any(filename.endswith(extension) for extension in _OPENERS)
+
+
+def open_program(filename: str) -> TextIO:
+    """Open the given file for reading text, decompressing it if needed.
+
+    :param filename: the path of a (possibly compressed) file
+    :return: a text stream
+    """
+    for extension, opener in _OPENERS.items():
+        if filename.endswith(extension):
+            return io.TextIOWrapper(opener(filename, 'rb'), encoding='utf-8')
+    return open(filename, encoding='utf-8')
+
+
+def split_statements(lines: Iterable[str], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """Group the given lines of an ASP program into chunks of complete statements.
+
+    A chunk is closed at the end of the first line after chunk_size characters that terminates a statement, outside of
+    strings and comments.
+    After a ``#program`` directive, all remaining lines are grouped in a single chunk, as chunks are added to the
+    controller independently, and the part of the program that a chunk belongs to would be lost otherwise.
+
+    :param lines: the lines of a program, with line terminators
+    :param chunk_size: the minimum number of characters in each chunk, but the last one
+    :return: an iterator over chunks
+    """
+    chunk = []
+    size = 0
+    pending = False
+    in_block_comment = False
+    single_chunk = False
+    for line in lines:
+        chunk.append(line)
+        size += len(line)
+        if single_chunk:
+            continue
+        if in_block_comment or '"' in line or '%' in line:
+            pending, in_block_comment = _scan(line, pending, in_block_comment)
+        else:
+            stripped = line.rstrip()
+            if stripped:
+                pending = not stripped.endswith('.') or stripped.endswith('..')
+        if '#program' in line and not in_block_comment:
+            single_chunk = True
+        elif size >= chunk_size and not pending and not in_block_comment:
+            yield ''.join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield ''.join(chunk)
+
+
+def _scan(line: str, pending: bool, in_block_comment: bool):
+    index = 0
+    length = len(line)
+    while index < length:
+        char = line[index]
+        if in_block_comment:
+            end = line.find('*%', index)
+            if end == -1:
+                return pending, True
+            in_block_comment = False
+            index = end + 2
+            continue
+        if char == '%':
+            if line.startswith('%*', index):
+                in_block_comment = True
+                index += 2
+                continue
+            break
+        if char == '"':
+            index += 1
+            while index < length and line[index] != '"':
+                index += 2 if line[index] == '\\' else 1
+        elif char == '.':
+            if line.startswith('..', index):
+                pending = True
+                index += 2
+                continue
+            pending = False
+        elif not char.isspace():
+            pending = True
+        index += 1
+    return pending, in_block_comment
+
+
+def add_stream(control: clingo.Control, stream: Iterable[str], chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+    """Add the program read from the given stream to the base program of control, in chunks of complete statements.
+
+    :param control: a controller
+    :param stream: a text stream, or any iterable of lines
+    :param chunk_size: the minimum number of characters added at once
+    """
+    for chunk in split_statements(stream, chunk_size):
+        control.add("base", [], chunk)
+
+
+def load(control: clingo.Control, filename: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+    """Load the given file in the base program of control.
+
+    :param control: a controller
+    :param filename: the path of a (possibly compressed) file, or ``-`` for the standard input
+    :param chunk_size: the minimum number of characters added at once, for compressed files and the standard input
+    """
+    if filename == '-':
+        add_stream(control, sys.stdin, chunk_size)
+    elif not is_compressed(filename):
+        control.load(filename)
+    else:
+        with open_program(filename) as f:
+            add_stream(control, f, chunk_size)
@@ -8,34 +8,19 @@ Here is an example of usage for a valid file:
 .. code-block:: bash
 
     (valasp) $ cat examples/bday.yaml
-    valasp:
-        python: |+
-            import datetime
-        asp: |+
-
-    date:
-        year: Integer
-        month: Integer
-        day: Integer
-
-        valasp:
-            validate_predicate: False
-            with_fun: TUPLE
-            after_init: |+
-                datetime.datetime(self.year, self.month, self.day)
-
     bday:
-        name:
-            type: Alpha
-            min: 3
-        date: date
+        name: Alpha
+        date: Date
 
     (valasp) $ cat examples/bday.valid.asp
     bday(sofia, (2019,6,25)).
     bday(leonardo, (2018,2,1)).
 
     (valasp) $ python -m valasp examples/bday.yaml examples/bday.valid.asp
+    ALL VALID!
+    ==========
     Answer: bday(sofia,(2019,6,25)) bday(leonardo,(2018,2,1))
+    ==========
 
 
 And here is an example of invalid file:
@@ -48,83 +33,268 @@ And here is an example of invalid file:
     bday(bigel, (1982,123)).
 
     (valasp) $ python -m valasp examples/bday.yaml examples/bday.invalid.asp
-    <block>:31:17-51: error: error in context:
-      Traceback (most recent call last):
-        File "<def valasp_validate_bday(value)>", line 2, in valasp_validate_bday
-        File "<def Bday.__init__(self, value)>", line 16, in Bday____init__
-        File "<def Date.__init__(self, value)>", line 7, in Date____init__
-      ValueError: expecting arity 3 for TUPLE, but found 2
+    VALIDATION FAILED
+    =================
+    Invalid instance of bday:
+        in constructor of bday
+      with error: expecting date (year,month,day), but received (1982,123) in atom bday(bigel,(1982,123))
+    =================
 
 
 Functions in this module are not intended to be used directly or imported in some other module of this project.
 """
 
+import functools
+import hashlib
+import io
+import json
+import os
 import runpy
+import shlex
 import sys
 import tempfile
-from typing import List, Callable
+import time
+from typing import List, Callable, Dict, Optional, Tuple
 
 import yaml
 
-from valasp.translators.yaml2python import Yaml2Python
+import valasp.enums
+from valasp import __version__
+from valasp.translators.yaml2python import BASE_DIRECTORY_ASSIGNMENT, Yaml2Python
+
+
+WATCH_INTERVAL = 0.5
+
+last_module = None
 
 
 def parse_args(args, stdout, stderr) -> Callable:
     print_only = False
     valid_only = False
-    for arg in args:
+    watch = False
+    options = {}
+    remaining = []
+    args_iterator = iter(args)
+    for arg in args_iterator:
         if arg == '--print':
             print_only = True
-        if arg == '--valid-only':
+        elif arg == '--valid-only':
             valid_only = True
-    args[:] = filter(lambda arg: arg != '--print', args)
-    args[:] = filter(lambda arg: arg != '--valid-only', args)
+        elif arg == '--quiet':
+            options['quiet'] = True
+        elif arg == '--watch':
+            watch = True
+        elif arg == '--clingo-args' or arg.startswith('--clingo-args='):
+            value = arg[len('--clingo-args='):] if arg.startswith('--clingo-args=') else next(args_iterator, '')
+            options.setdefault('control_args', []).extend(shlex.split(value))
+        elif arg == '--models' or arg.startswith('--models='):
+            value = arg[len('--models='):] if arg.startswith('--models=') else next(args_iterator, '')
+            if not value.isdigit():
+                print('Option --models expects a non-negative integer (0 for all models).', file=stderr)
+                exit(1)
+            options['models'] = int(value)
+        elif arg == '--table' or arg.startswith('--table='):
+            value = arg[len('--table='):] if arg.startswith('--table=') else next(args_iterator, '')
+            predicate, sep, filename = value.partition('=')
+            if not sep or not predicate or not filename:
+                print('Option --table expects an argument of the form predicate=file, as in --table user=users.csv', file=stderr)
+                exit(1)
+            options.setdefault('tables', []).append((predicate, filename))
+        elif arg in ('--snapshot', '--save-snapshot') or arg.startswith('--snapshot=') or arg.startswith('--save-snapshot='):
+            name, sep, value = arg.partition('=')
+            if not sep:
+                value = next(args_iterator, '')
+            if not value:
+                print(f'Option {name} expects a file name.', file=stderr)
+                exit(1)
+            if name == '--snapshot':
+                options.setdefault('snapshots', []).append(value)
+            else:
+                options['save_snapshot'] = value
+        elif arg == '--cache' or arg.startswith('--cache='):
+            value = arg[len('--cache='):] if arg.startswith('--cache=') else next(args_iterator, '')
+            if not value:
+                print('Option --cache expects a directory.', file=stderr)
+                exit(1)
+            options['cache'] = value
+        else:
+            remaining.append(arg)
+    args[:] = remaining
 
     if len(args) < 1:
-        print('To validate a YAML file against one or more ASP files, also running clingo:\n'
+        print('To validate a YAML file against one or more ASP files (- for the standard input), also running clingo:\n'
               '\tpython -m valasp <YAML file> [ASP files]\n'
               'To produce Python code to ease validation in couple with clingo:\n'
-              '\tpython -m valasp --print <YAML file>', file=stderr)
+              '\tpython -m valasp --print <YAML file>\n'
+              'Other options:\n'
+              '\t--valid-only    validate without searching for models\n'
+              '\t--models N      search for at most N models (0 for all models)\n'
+              '\t--quiet         do not print models\n'
+              '\t--table P=F     add the rows of the CSV or JSONL file F as facts of predicate P\n'
+              '\t--save-snapshot F  save the validated facts in the snapshot file F (facts of other predicates must\n'
+              '\t                be passed again as ASP files to runs using the snapshot)\n'
+              '\t--snapshot F    add the facts of the snapshot file F, without validating them again\n'
+              '\t--cache D       reuse the output of previous runs on the same inputs, stored in directory D\n'
+              '\t--watch         validate again whenever some of the input files change\n'
+              '\t--clingo-args A pass the (quoted) arguments A to clingo, as in --clingo-args "-t 4"', file=stderr)
         exit(1)
 
     if print_only and valid_only:
         print('Options --print and --valid-only are incompatible.')
         exit(1)
+    if watch and (print_only or '-' in args[1:] or 'save_snapshot' in options):
+        print('Option --watch is incompatible with --print, --save-snapshot and the standard input.', file=stderr)
+        exit(1)
     if print_only:
         return print_python_code
     if valid_only:
-        return run_clingo_without_solve
-    return run_clingo_with_solve
+        callback = functools.partial(run_clingo_without_solve, **options)
+    else:
+        callback = functools.partial(run_clingo_with_solve, **options)
+    if watch:
+        other_files = [filename for _, filename in options.get('tables', [])] + options.get('snapshots', [])
+        return functools.partial(watch_files, callback, args[0], other_files)
+    return callback
 
 
-def process_yaml(yaml_file: str) -> List[str]:
+def process_yaml(yaml_file: str) -> Tuple[List[str], List[str]]:
     with open(yaml_file) as f:
-        yaml_input = yaml.safe_load(f)
-        yaml2python = Yaml2Python(yaml_input)
-        return yaml2python.convert2python()
+        yaml_input = yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+        yaml2python = Yaml2Python(yaml_input, base_dir=os.path.dirname(os.path.abspath(yaml_file)))
+        return yaml2python.convert2python(), yaml2python.enum_files()
 
 
-def print_python_code(asp_files, validation_code, stdout, stderr):
+def print_python_code(asp_files, validation_code, stdout, stderr, spec_files=None):
     if asp_files:
         print(f'# files {asp_files} have been ignored', file=stdout)
     print('\n'.join(validation_code), file=stdout)
 
 
-def run_clingo(asp_files, validation_code, with_solve, stdout, stderr):
-    with tempfile.NamedTemporaryFile() as validation_file:
-        for line in validation_code:
-            validation_file.write(line.encode())
-        validation_file.seek(0)
-        mod = runpy.run_path(path_name=validation_file.name)
-        mod['main'](asp_files, with_solve=with_solve, stdout=stdout, stderr=stderr)
+def spec_key(validation_code: List[str]) -> str:
+    # the directory of the specification is not hashed, so that keys do not depend on the location of the checkout;
+    # files of enumerations are resolved with respect to it, and their content is hashed as part of spec_files
+    code = [part for part in validation_code if not part.startswith(BASE_DIRECTORY_ASSIGNMENT)]
+    return hashlib.sha256('\n'.join([__version__] + code).encode()).hexdigest()
 
 
-def run_clingo_with_solve(asp_files, validation_code, stdout, stderr):
-    run_clingo(asp_files, validation_code, True, stdout, stderr)
+def file_hash(filename: str) -> str:
+    res = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            res.update(block)
+    return res.hexdigest()
 
 
-def run_clingo_without_solve(asp_files, validation_code, stdout, stderr):
-    run_clingo(asp_files, validation_code, False, stdout, stderr)
+def cache_file(cache_dir: str, key: str, asp_files, spec_files, with_solve, options) -> Optional[str]:
+    if '-' in asp_files or 'save_snapshot' in options:
+        return None
+    try:
+        content = {
+            'spec': key,
+            'spec_files': [file_hash(file_) for file_ in spec_files],
+            'asp_files': [file_hash(file_) for file_ in asp_files],
+            'tables': [(predicate, file_hash(file_)) for predicate, file_ in options.get('tables', [])],
+            'snapshots': [file_hash(file_) for file_ in options.get('snapshots', [])],
+            'with_solve': with_solve,
+            'options': {k: v for k, v in options.items() if k not in ('tables', 'snapshots', 'snapshot_key')},
+        }
+    except OSError:
+        return None
+    digest = hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+    return os.path.join(cache_dir, digest)
+
+
+class Tee:
+    def __init__(self, *streams):
+        self.streams = streams
+
+    def write(self, s):
+        for stream in self.streams:
+            stream.write(s)
+        return len(s)
+
+    def flush(self):
+        for stream in self.streams:
+            stream.flush()
+
+
+def load_module(key: str, validation_code: List[str]) -> dict:
+    global last_module
+    if last_module is None or last_module[0] != key:
+        with tempfile.NamedTemporaryFile() as validation_file:
+            for line in validation_code:
+                validation_file.write(line.encode())
+            validation_file.seek(0)
+            last_module = (key, runpy.run_path(path_name=validation_file.name))
+    return last_module[1]
+
+
+def run_clingo(asp_files, validation_code, with_solve, stdout, stderr, spec_files=None, **options):
+    cache_dir = options.pop('cache', None)
+    key = spec_key(validation_code)
+    if 'snapshots' in options or 'save_snapshot' in options:
+        options['snapshot_key'] = key
+    cached = cache_file(cache_dir, key, asp_files, spec_files or [], with_solve, options) if cache_dir else None
+    if cached is not None and os.path.exists(cached):
+        with open(cached, encoding='utf-8') as f:
+            stdout.write(f.read())
+        return
+    output = io.StringIO()
+    mod = load_module(key, validation_code)
+    mod['main'](asp_files, with_solve=with_solve, stdout=stdout if cached is None else Tee(stdout, output),
+                stderr=stderr, **options)
+    if cached is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=cache_dir, delete=False) as f:
+            f.write(output.getvalue())
+        os.replace(f.name, cached)
+
+
+def run_clingo_with_solve(asp_files, validation_code, stdout, stderr, **options):
+    run_clingo(asp_files, validation_code, True, stdout, stderr, **options)
+
+
+def run_clingo_without_solve(asp_files, validation_code, stdout, stderr, **options):
+    run_clingo(asp_files, validation_code, False, stdout, stderr, **options)
+
+
+def modification_times(files: List[str]) -> Dict[str, Optional[int]]:
+    res = {}
+    for file_ in files:
+        try:
+            res[file_] = os.stat(file_).st_mtime_ns
+        except OSError:
+            res[file_] = None
+    return res
+
+
+def watch_files(callback, yaml_file, other_files, asp_files, validation_code, stdout, stderr, spec_files=None):
+    spec_files = spec_files or []
+    callback(asp_files, validation_code, stdout, stderr, spec_files=spec_files)
+    times = modification_times([yaml_file] + spec_files + asp_files + other_files)
+    spec_valid = True
+    try:
+        while True:
+            time.sleep(WATCH_INTERVAL)
+            new_times = modification_times([yaml_file] + spec_files + asp_files + other_files)
+            if new_times == times:
+                continue
+            changed = [file_ for file_, mtime in new_times.items() if times.get(file_) != mtime]
+            times = new_times
+            print(f'# changed: {", ".join(changed)}', file=stdout)
+            try:
+                # after a failed translation, the previous code must not be used: retry until the spec is fixed
+                if not spec_valid or yaml_file in changed or any(file_ in changed for file_ in spec_files):
+                    spec_valid = False
+                    validation_code, spec_files = process_yaml(yaml_file)
+                    spec_valid = True
+                    valasp.enums.clear_cache()
+                    times = modification_times([yaml_file] + spec_files + asp_files + other_files)
+                callback(asp_files, validation_code, stdout, stderr, spec_files=spec_files)
+            except Exception as e:
+                print(e, file=stderr)
+    except KeyboardInterrupt:
+        pass
 
 
 def main(args: List[str], stdout=sys.stdout, stderr=sys.stderr):
@@ -134,8 +304,8 @@ def main(args: List[str], stdout=sys.stdout, stderr=sys.stderr):
     asp_files = args[1:]
 
     try:
-        validation_code = process_yaml(yaml_file)
-        callback(asp_files, validation_code, stdout, stderr)
+        validation_code, spec_files = process_yaml(yaml_file)
+        callback(asp_files, validation_code, stdout, stderr, spec_files=spec_files)
     except Exception as e:
         print(e, file=stderr)
 
@@ -0,0 +1,81 @@
+# This file is part of ValAsp which is released under the Apache License, Version 2.0.
+# See file README.md for full license details.
+
+"""Tabular instances in CSV and JSONL files are read by this module, to be added as facts.
+
+Files are read lazily, one row at a time, so that they can be validated and passed to clingo with bounded memory
+(see :meth:`valasp.core.Context.valasp_add_facts`).
+Rows are produced as tuples of values in the order of the given columns.
+"""
+
+import csv
+import json
+from typing import Any, Iterator, List, Tuple
+
+
+def read_csv(filename: str, columns: List[str]) -> Iterator[Tuple[Any, ...]]:
+    """Return the rows of the given CSV file.
+
+    The first line of the file is a header naming its columns; columns not in the given list are ignored.
+    All values are strings.
+
+    :param filename: the path of a CSV file
+    :param columns: the names of the columns to read
+    :raise: ValueError if the header misses some of the given columns
+    :return: an iterator over tuples of strings
+    """
+    with open(filename, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        missing = [column for column in columns if column not in header]
+        if missing:
+            raise ValueError(f"{filename}: missing columns {', '.join(missing)}")
+        indices = [header.index(column) for column in columns]
+        for row in reader:
+            if not row:
+                continue
+            if len(row) != len(header):
+                raise ValueError(f"{filename}:{reader.line_num}: expecting {len(header)} values, but found {len(row)}")
+            yield tuple(row[index] for index in indices)
+
+
+def read_jsonl(filename: str, columns: List[str]) -> Iterator[Tuple[Any, ...]]:
+    """Return the rows of the given JSONL file.
+
+    Each line of the file is a JSON object mapping names of columns to values; keys not in the given list are ignored.
+    Values are kept as decoded, except for lists that are mapped to tuples.
+
+    :param filename: the path of a JSONL file
+    :param columns: the names of the columns to read
+    :raise: ValueError if some line is not an object, or it misses some of the given columns
+    :return: an iterator over tuples of values
+    """
+    def to_tuple(value):
+        return tuple(to_tuple(v) for v in value) if isinstance(value, list) else value
+
+    with open(filename, encoding='utf-8') as f:
+        for line_num, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError(f"{filename}:{line_num}: expecting an object")
+            missing = [column for column in columns if column not in row]
+            if missing:
+                raise ValueError(f"{filename}:{line_num}: missing columns {', '.join(missing)}")
+            yield tuple(to_tuple(row[column]) for column in columns)
+
+
+def read_table(filename: str, columns: List[str]) -> Iterator[Tuple[Any, ...]]:
+    """Return the rows of the given file, read according to its extension (.csv or .jsonl).
+
+    :param filename: the path of a CSV or JSONL file
+    :param columns: the names of the columns to read
+    :raise: ValueError if the extension is not supported
+    :return: an iterator over tuples of values
+    """
+    if filename.endswith('.csv'):
+        return read_csv(filename, columns)
+    if filename.endswith('.jsonl'):
+        return read_jsonl(filename, columns)
+    raise ValueError(f"{filename}: expecting a .csv or .jsonl file")
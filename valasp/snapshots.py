@@ -0,0 +1,70 @@
+# This file is part of ValAsp which is released under the Apache License, Version 2.0.
+# See file README.md for full license details.
+
+"""Snapshots of validated instances are saved and loaded by this module.
+
+A snapshot stores the facts of validated predicates in a ground program, together with a key identifying the
+specification they were validated against (for example, a hash of the generated validation code).
+For each validated predicate, the snapshot also stores the terms passed to its validator, so that a later run can
+mark them as already validated (see :meth:`valasp.core.Context.valasp_add_snapshot`).
+
+Snapshots are JSON files compressed with gzip, containing only strings.
+Atoms are parsed as terms when loaded, so that a snapshot cannot inject rules or directives in the program, and they are
+added to the program as symbols, without parsing or grounding them again.
+"""
+
+import gzip
+import json
+import zlib
+from typing import Dict, List, Tuple
+
+import clingo
+
+FORMAT = 1
+
+
+def save(filename: str, atoms: List[clingo.Symbol], terms: Dict[str, List[clingo.Symbol]], key: str = '') -> None:
+    """Save a snapshot with the given atoms.
+
+    :param filename: the path of the snapshot
+    :param atoms: the facts to store
+    :param terms: a dictionary mapping predicates to the validated terms of their atoms
+    :param key: the key of the specification used to validate the atoms
+    """
+    content = {
+        'format': FORMAT,
+        'key': key,
+        'atoms': [str(atom) for atom in atoms],
+        'terms': {predicate: [str(term) for term in values] for predicate, values in terms.items()},
+    }
+    with gzip.open(filename, 'wt', encoding='utf-8') as f:
+        json.dump(content, f)
+
+
+def load(filename: str, key: str = '') -> Tuple[List[clingo.Symbol], Dict[str, List[clingo.Symbol]]]:
+    """Return the content of the given snapshot.
+
+    :param filename: the path of the snapshot
+    :param key: the key of the current specification
+    :raise: ValueError if the file is not a snapshot, or if it was saved with a different key
+    :return: the stored facts, and the validated terms of each predicate
+    """
+    try:
+        with gzip.open(filename, 'rt', encoding='utf-8') as f:
+            content = json.load(f)
+    except (OSError, EOFError, zlib.error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"{filename}: not a snapshot") from e
+    if not isinstance(content, dict) or content.get('format') != FORMAT \
+            or not isinstance(content.get('atoms'), list) or not isinstance(content.get('terms'), dict):
+        raise ValueError(f"{filename}: not a snapshot")
+    if content.get('key') != key:
+        raise ValueError(f"{filename}: snapshot of a different specification")
+    parse = clingo.parse_term
+    try:
+        atoms = [parse(atom) for atom in content['atoms']]
+        terms = {predicate: [parse(term) for term in values] for predicate, values in content['terms'].items()}
+    except RuntimeError as e:
+        raise ValueError(f"{filename}: not a snapshot") from e
+    if any(atom.type != clingo.SymbolType.Function or not atom.name for atom in atoms):
+        raise ValueError(f"{filename}: not a snapshot")
+    return atoms, terms
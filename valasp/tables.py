@@ -0,0 +1,130 @@
+# This file is part of ValAsp which is released under the Apache License, Version 2.0.
+# See file README.md for full license details.
+
+"""The class :class:`Table` is defined in this module, to store validated atoms in columns.
+
+Integer attributes are stored in arrays of machine integers, and strings (including the names of constants) are
+interned in a vocabulary and stored as arrays of codes.
+Other attributes are stored in plain lists.
+"""
+
+import array
+from typing import Any, Dict, List, Union
+
+INT = 'int'
+STR = 'str'
+OBJECT = 'object'
+
+
+class Table:
+    """Columnar storage of the instances of a class processed by the ``valasp`` decorator."""
+
+    def __init__(self, columns: Dict[str, str]):
+        """Create an empty table.
+
+        :param columns: a dictionary mapping attribute names to the kind of their column (INT, STR or OBJECT)
+        :raise: ValueError if some kind is unknown
+        """
+        self.__kinds = dict(columns)
+        self.__data: Dict[str, Union[array.array, List[Any]]] = {}
+        self.__vocabularies: Dict[str, List[str]] = {}
+        self.__codes: Dict[str, Dict[str, int]] = {}
+        for name, kind in self.__kinds.items():
+            if kind == INT or kind == STR:
+                self.__data[name] = array.array('i')
+                if kind == STR:
+                    self.__vocabularies[name] = []
+                    self.__codes[name] = {}
+            elif kind == OBJECT:
+                self.__data[name] = []
+            else:
+                raise ValueError(f"unknown kind of column: {kind}")
+        self.__size = 0
+
+    def append(self, obj: Any) -> None:
+        """Add a row with the attributes of the given object.
+
+        :param obj: an instance of the class associated with this table
+        """
+        for name, kind in self.__kinds.items():
+            value = getattr(obj, name)
+            if kind == STR:
+                codes = self.__codes[name]
+                code = codes.get(value)
+                if code is None:
+                    code = codes[value] = len(codes)
+                    self.__vocabularies[name].append(value)
+                value = code
+            self.__data[name].append(value)
+        self.__size += 1
+
+    def __len__(self) -> int:
+        return self.__size
+
+    def names(self) -> List[str]:
+        """Return the names of the columns.
+
+        :return: a list of attribute names
+        """
+        return list(self.__kinds)
+
+    def kind(self, name: str) -> str:
+        """Return the kind of the given column.
+
+        :param name: the name of a column
+        :return: one of INT, STR and OBJECT
+        """
+        return self.__kinds[name]
+
+    def codes(self, name: str) -> Union[array.array, List[Any]]:
+        """Return the stored data of the given column, without decoding strings.
+
+        :param name: the name of a column
+        :return: an array of integers for INT and STR columns (codes in the vocabulary for the latter), or a list
+        """
+        return self.__data[name]
+
+    def vocabulary(self, name: str) -> List[str]:
+        """Return the distinct strings of the given STR column, in order of first occurrence.
+
+        :param name: the name of a STR column
+        :return: a list of strings, to be indexed by codes
+        """
+        return self.__vocabularies[name]
+
+    def column(self, name: str) -> Union[array.array, List[Any]]:
+        """Return the values of the given column.
+
+        Strings are decoded, but interned: each distinct string is a single object.
+
+        :param name: the name of a column
+        :return: an array of integers for INT columns, and a list otherwise
+        """
+        if self.__kinds[name] == STR:
+            vocabulary = self.__vocabularies[name]
+            return [vocabulary[code] for code in self.__data[name]]
+        return self.__data[name]
+
+    def to_numpy(self) -> Dict[str, Any]:
+        """Return the columns as NumPy arrays; NumPy must be installed.
+
+        INT columns are exposed without copy; STR columns are returned as arrays of strings, and OBJECT columns as
+        arrays of objects.
+
+        :raise: ImportError if NumPy is not available
+        :return: a dictionary mapping names of columns to arrays
+        """
+        import numpy
+        res = {}
+        for name, kind in self.__kinds.items():
+            data = self.__data[name]
+            if kind == INT:
+                res[name] = numpy.frombuffer(data, dtype=numpy.intc) if data else numpy.zeros(0, dtype=numpy.intc)
+            elif kind == STR:
+                codes = numpy.frombuffer(data, dtype=numpy.intc) if data else numpy.zeros(0, dtype=numpy.intc)
+                res[name] = numpy.array(self.__vocabularies[name], dtype=str)[codes] if len(codes) else numpy.zeros(0, dtype=str)
+            else:
+                res[name] = numpy.empty(len(data), dtype=object)
+                for index, value in enumerate(data):
+                    res[name][index] = value
+        return res
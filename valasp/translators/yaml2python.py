@@ -1,18 +1,32 @@
 import base64
+import datetime
+import os
 from typing import List
 
 from valasp.domain.names import PredicateName
+from valasp.domain.primitive_types import Date
 from valasp.translators.yaml_validation import YamlValidation
 
 INT_MIN = int(-pow(2, 31))
 INT_MAX = int(pow(2, 31) - 1)
 all_symbols = set()
+all_references = {}
+all_enum_files = set()
+base_directory = '.'
+BASE_DIRECTORY_ASSIGNMENT = 'valasp_base_directory = '
 
 
 def _encode(x):
     return base64.b64encode(str(x).encode())
 
 
+def _enum_file_check(term_name, term_type, enum_file):
+    all_enum_files.add(os.path.abspath(os.path.join(base_directory, enum_file)))
+    path = f"os.path.join(valasp_base_directory, _({_encode(os.path.normpath(enum_file))}))"
+    message = ErrorMessages.raise_error(f'Should be one of the values in {{{path}}}', ['self.%s' % term_name])
+    return f"if self.{term_name} not in valasp.enums.load_enum({path}, '{term_type}'): raise ValueError({message})"
+
+
 class ErrorMessages:
 
     @staticmethod
@@ -35,6 +49,9 @@ class Symbol:
         self.__validate_predicate = True
         self.__with_fun = 'FORWARD_IMPLICIT'
         self.__auto_blacklist = True
+        self.__unique = None
+        self.__graph = None
+        self.__nil = None
         self.__after_init = None
         self.__before_grounding = None
         self.__after_grounding = None
@@ -56,6 +73,8 @@ class Symbol:
                     term = StringTerm(content[term_name], term_name)
                 elif term_type == 'Alpha':
                     term = AlphaTerm(content[term_name], term_name)
+                elif term_type == 'Date':
+                    term = DateTerm(content[term_name], term_name)
                 elif term_type == 'Any':
                     term = GenericTerm(content[term_name], term_name, 'Any')
                 else:
@@ -66,6 +85,10 @@ class Symbol:
                 self.__terms.append(term)
             else:
                 self.__valasp = content[term_name]
+        for term in self.__terms:
+            for group in term.group_by_terms:
+                if not self.__exists_term(group):
+                    raise ValueError(f'{self.__name}: {term.term_name}: group_by: {group} is not a term name')
         if self.__valasp is not None:
             self.__parse_valasp()
 
@@ -86,6 +109,14 @@ class Symbol:
                 self.__with_fun = self.__valasp[c]
             elif c == 'auto_blacklist':
                 self.__auto_blacklist = self.__valasp[c]
+            elif c == 'unique':
+                self.__unique = self.__valasp[c]
+                self.__parse_unique()
+            elif c == 'graph':
+                self.__graph = self.__valasp[c]
+                self.__parse_graph()
+            elif c == 'nil':
+                self.__nil = self.__valasp[c]
             elif c == 'after_init':
                 self.__after_init = self.__valasp[c]
             elif c == 'before_grounding':
@@ -93,6 +124,35 @@ class Symbol:
             else:
                 assert c == 'after_grounding'
                 self.__after_grounding = self.__valasp[c]
+        if self.__unique and not self.__validate_predicate:
+            raise ValueError(f'{self.__name}: unique requires validate_predicate')
+
+    def __parse_unique(self):
+        for i in self.__unique:
+            if not self.__exists_term(i):
+                raise ValueError(f'{self.__name}: unique: {i} is not a term name')
+
+    def __parse_graph(self):
+        for i in ('from', 'to'):
+            if not self.__exists_term(self.__graph[i]):
+                raise ValueError(f'{self.__name}: graph: {i}: {self.__graph[i]} is not a term name')
+
+    def __process_graph(self):
+        if self.__graph is None:
+            return
+        self.__post_init_content.append(f"\t\tself.valasp_state().graph_edges.append((self.{self.__graph['from']}, self.{self.__graph['to']}))")
+        self.__other_methods_content.append('\t@classmethod')
+        self.__other_methods_content.append('\tdef before_grounding_init_graph(cls, state): state.graph_edges = []')
+        self.__other_methods_content.append('\t@classmethod')
+        self.__other_methods_content.append('\tdef after_grounding_check_graph(cls, state):')
+        if self.__graph.get('acyclic', False):
+            self.__other_methods_content.append('\t\tcycle = valasp.graphs.find_cycle(state.graph_edges)')
+            self.__other_methods_content.append(f"\t\tif cycle is not None: raise ValueError('predicate {self.__name} is not acyclic: ' + ' -> '.join(str(x) for x in cycle))")
+        if self.__graph.get('connected', False):
+            self.__other_methods_content.append('\t\tdisconnected = valasp.graphs.find_disconnected(state.graph_edges)')
+            self.__other_methods_content.append(f"\t\tif disconnected is not None: raise ValueError(f'predicate {self.__name} is not connected: no path between {{disconnected[0]}} and {{disconnected[1]}}')")
+        if not self.__graph.get('acyclic', False) and not self.__graph.get('connected', False):
+            self.__other_methods_content.append('\t\tpass')
 
     def __parse_having(self):
         for i in self.__having:
@@ -106,10 +166,15 @@ class Symbol:
                 raise ValueError(f'{self.__name}: having: {i}: {list_of_comparisons[2]} is not a term name')
 
     def convert2python(self):
-        self.__declaration_content.append(f"@context.valasp(validate_predicate={self.__validate_predicate}, with_fun=valasp.domain.primitive_types.Fun.{self.__with_fun}, auto_blacklist={self.__auto_blacklist})")
+        unique = f", unique={self.__unique}" if self.__unique else ''
+        nil = f", nil='{self.__nil}'" if self.__nil else ''
+        self.__declaration_content.append(f"@context.valasp(validate_predicate={self.__validate_predicate}, with_fun=valasp.domain.primitive_types.Fun.{self.__with_fun}, auto_blacklist={self.__auto_blacklist}{unique}{nil})")
         self.__declaration_content.append(f"class {self.__name.to_class().value}:")
         for term in self.__terms:
-            self.__declaration_content.append(f"\t{term.term_name}: {term.term_type}")
+            if term.term_type == self.__name.to_class().value:
+                self.__declaration_content.append(f"\t{term.term_name}: '{term.term_type}'")
+            else:
+                self.__declaration_content.append(f"\t{term.term_name}: {term.term_type}")
 
         self.__post_init_content.append("\tdef __post_init__(self):")
         for term in self.__terms:
@@ -117,6 +182,13 @@ class Symbol:
             for i in term.post_init_content:
                 self.__post_init_content.append(f"\t\t{i}")
 
+        for term in all_references.get(self.__name.value, ()):
+            self.__post_init_content.append(f'\t\tself.valasp_state().keys_of_{term}.add(self.{term})')
+            self.__other_methods_content.append('\t@classmethod')
+            self.__other_methods_content.append(f'\tdef before_grounding_init_keys_{term}(cls, state): state.keys_of_{term} = set()')
+
+        self.__process_graph()
+
         for having in self.__having:
             m = YamlValidation.match_having(having)
             assert m
@@ -137,13 +209,13 @@ class Symbol:
 
         if self.__before_grounding is not None:
             self.__other_methods_content.append('\t@classmethod')
-            self.__other_methods_content.append(f'\tdef before_grounding_{self.__name}(cls):')
+            self.__other_methods_content.append(f'\tdef before_grounding_{self.__name}(cls, state):')
             afg = self.__before_grounding.split('\n')
             for j in afg:
                 self.__other_methods_content.append('\t\t%s' % j)
         if self.__after_grounding is not None:
             self.__other_methods_content.append('\t@classmethod')
-            self.__other_methods_content.append(f'\tdef after_grounding_{self.__name}(cls):')
+            self.__other_methods_content.append(f'\tdef after_grounding_{self.__name}(cls, state):')
             afg = self.__after_grounding.split('\n')
             for j in afg:
                 self.__other_methods_content.append('\t\t%s' % j)
@@ -166,6 +238,8 @@ class GenericTerm:
         self.other_methods_content = []
         self.predicate_name = ''
         self.__count = None
+        self.__references = None
+        self.group_by_terms = []
         if isinstance(content, dict):
             self.__parse_content(content)
 
@@ -179,21 +253,64 @@ class GenericTerm:
                 self.__count = {'min': value, 'max': value}
             else:
                 self.__count = value
+                self.group_by_terms.extend(value.get('group_by', []))
+        if 'references' in content:
+            self.__references = content['references']
+
+    def process_grouped_aggregate(self, kind, attribute, bounds, description, messages, condition=None, increment='1'):
+        group_by = bounds['group_by']
+        if len(group_by) == 1:
+            key = f'self.{group_by[0]}'
+            groups = group_by[0]
+        else:
+            key = '(' + ', '.join(f'self.{g}' for g in group_by) + ')'
+            groups = '(' + ', '.join(group_by) + ')'
+        self.other_methods_content.append('@classmethod')
+        self.other_methods_content.append(f'def before_grounding_init_{kind}_{self.term_name}(cls, state): state.{attribute} = collections.defaultdict(int)')
+        self.other_methods_content.append('@classmethod')
+        self.other_methods_content.append(f'def after_grounding_check_{kind}_{self.term_name}(cls, state):')
+        for bound, op, message in (('max', '>', messages[0]), ('min', '<', messages[1])):
+            if bound in bounds:
+                self.other_methods_content.append(f'\tinvalid = sorted(str(k) for k, v in state.{attribute}.items() if v {op} {bounds[bound]})')
+                self.other_methods_content.append(f'\tif invalid: raise ValueError(\'{description} {message} {bounds[bound]} for {groups} \' + \', \'.join(invalid[:10]))')
+        if condition is None:
+            self.post_init_content.append(f'self.valasp_state().{attribute}[{key}] += {increment}')
+        else:
+            self.post_init_content.append(f'if {condition}:')
+            self.post_init_content.append(f'\tself.valasp_state().{attribute}[{key}] += {increment}')
 
     def convert2python(self):
-        if self.__count is not None:
+        if self.__count is not None and 'group_by' in self.__count:
+            self.process_grouped_aggregate('count', f'count_of_{self.term_name}', self.__count,
+                                           f'count of {self.term_name} in predicate {self.predicate_name}',
+                                           ('may exceed', 'cannot reach'))
+        elif self.__count is not None:
             self.other_methods_content.append('@classmethod')
             self.other_methods_content.append(
-                f'def before_grounding_init_count_{self.term_name}(cls): cls.count_of_{self.term_name} = 0')
+                f'def before_grounding_init_count_{self.term_name}(cls, state): state.count_of_{self.term_name} = 0')
             self.other_methods_content.append('@classmethod')
-            self.other_methods_content.append(f'def after_grounding_check_count_{self.term_name}(cls):')
+            self.other_methods_content.append(f'def after_grounding_check_count_{self.term_name}(cls, state):')
             if 'max' in self.__count:
                 max_bound = self.__count['max']
-                self.other_methods_content.append(f'\tif cls.count_of_{self.term_name} > {max_bound}: raise ValueError(\'count of {self.term_name} in predicate {self.predicate_name} may exceed {max_bound}\')')
+                self.other_methods_content.append(f'\tif state.count_of_{self.term_name} > {max_bound}: raise ValueError(\'count of {self.term_name} in predicate {self.predicate_name} may exceed {max_bound}\')')
             if 'min' in self.__count:
                 min_bound = self.__count['min']
-                self.other_methods_content.append(f'\tif cls.count_of_{self.term_name} < {min_bound}: raise ValueError(\'count of {self.term_name} in predicate {self.predicate_name} cannot reach {min_bound}\')')
-            self.post_init_content.append(f'self.__class__.count_of_{self.term_name} += 1')
+                self.other_methods_content.append(f'\tif state.count_of_{self.term_name} < {min_bound}: raise ValueError(\'count of {self.term_name} in predicate {self.predicate_name} cannot reach {min_bound}\')')
+            self.post_init_content.append(f'self.valasp_state().count_of_{self.term_name} += 1')
+        if self.__references is not None:
+            self.__process_references()
+
+    def __process_references(self):
+        predicate = self.__references['predicate']
+        term = self.__references['term']
+        class_name = PredicateName(predicate).to_class().value
+        self.other_methods_content.append('@classmethod')
+        self.other_methods_content.append(f'def before_grounding_init_references_{self.term_name}(cls, state): state.references_of_{self.term_name} = set()')
+        self.other_methods_content.append('@classmethod')
+        self.other_methods_content.append(f'def after_grounding_check_references_{self.term_name}(cls, state):')
+        self.other_methods_content.append(f'\tdangling = state.references_of_{self.term_name} - {class_name}.valasp_state().keys_of_{term}')
+        self.other_methods_content.append(f'\tif dangling: raise ValueError(f\'{self.term_name} in predicate {self.predicate_name} references {{len(dangling)}} undefined {term} of {predicate}: {{", ".join(sorted(str(x) for x in dangling)[:10])}}\')')
+        self.post_init_content.append(f'self.valasp_state().references_of_{self.term_name}.add(self.{self.term_name})')
 
 
 class IntegerTerm(GenericTerm):
@@ -205,6 +322,7 @@ class IntegerTerm(GenericTerm):
         self.__sum_positive = None
         self.__sum_negative = None
         self.__enum = None
+        self.__enum_file = None
         if isinstance(content, dict):
             self.__parse_content(content)
 
@@ -216,6 +334,7 @@ class IntegerTerm(GenericTerm):
         if 'sum+' in content:
             if content['sum+'] != 'Integer':
                 self.__sum_positive = content['sum+']
+                self.group_by_terms.extend(content['sum+'].get('group_by', []))
                 if 'max' not in content['sum+']:
                     self.__sum_positive['max'] = INT_MAX
             else:
@@ -223,43 +342,54 @@ class IntegerTerm(GenericTerm):
         if 'sum-' in content:
             if content['sum-'] != 'Integer':
                 self.__sum_negative = content['sum-']
+                self.group_by_terms.extend(content['sum-'].get('group_by', []))
                 if 'min' not in content['sum-']:
                     self.__sum_negative['min'] = INT_MIN
             else:
                 self.__sum_negative = {'min': INT_MIN}
         if 'enum' in content:
             self.__enum = content['enum']
+        if 'enum_file' in content:
+            self.__enum_file = content['enum_file']
 
     def __process_sums_positive(self):
-        if self.__sum_positive is not None:
+        if self.__sum_positive is not None and 'group_by' in self.__sum_positive:
+            self.process_grouped_aggregate('positive_sum', f'sum_positive_of_{self.term_name}', self.__sum_positive,
+                                           f'sum of {self.term_name} in predicate {self.predicate_name}',
+                                           ('may exceed', 'cannot reach'), f'self.{self.term_name} > 0', f'self.{self.term_name}')
+        elif self.__sum_positive is not None:
             self.other_methods_content.append('@classmethod')
-            self.other_methods_content.append(f'def before_grounding_init_positive_sum_{self.term_name}(cls): cls.sum_positive_of_{self.term_name} = 0')
+            self.other_methods_content.append(f'def before_grounding_init_positive_sum_{self.term_name}(cls, state): state.sum_positive_of_{self.term_name} = 0')
             self.other_methods_content.append('@classmethod')
-            self.other_methods_content.append(f'def after_grounding_check_positive_sum_{self.term_name}(cls):')
+            self.other_methods_content.append(f'def after_grounding_check_positive_sum_{self.term_name}(cls, state):')
             if 'max' in self.__sum_positive:
                 max_bound = self.__sum_positive['max']
-                self.other_methods_content.append(f'\tif cls.sum_positive_of_{self.term_name} > {max_bound}: raise ValueError(\'sum of {self.term_name} in predicate {self.predicate_name} may exceed {max_bound}\')')
+                self.other_methods_content.append(f'\tif state.sum_positive_of_{self.term_name} > {max_bound}: raise ValueError(\'sum of {self.term_name} in predicate {self.predicate_name} may exceed {max_bound}\')')
             if 'min' in self.__sum_positive:
                 min_bound = self.__sum_positive['min']
-                self.other_methods_content.append(f'\tif cls.sum_positive_of_{self.term_name} < {min_bound}: raise ValueError(\'sum of {self.term_name} in predicate {self.predicate_name} cannot reach {min_bound}\')')
+                self.other_methods_content.append(f'\tif state.sum_positive_of_{self.term_name} < {min_bound}: raise ValueError(\'sum of {self.term_name} in predicate {self.predicate_name} cannot reach {min_bound}\')')
 
             self.post_init_content.append(f'if self.{self.term_name} > 0:')
-            self.post_init_content.append(f'\tself.__class__.sum_positive_of_{self.term_name} += self.{self.term_name}')
+            self.post_init_content.append(f'\tself.valasp_state().sum_positive_of_{self.term_name} += self.{self.term_name}')
 
     def __process_sums_negative(self):
-        if self.__sum_negative is not None:
+        if self.__sum_negative is not None and 'group_by' in self.__sum_negative:
+            self.process_grouped_aggregate('negative_sum', f'sum_negative_of_{self.term_name}', self.__sum_negative,
+                                           f'sum of {self.term_name} in predicate {self.predicate_name}',
+                                           ('cannot reach', 'may exceed'), f'self.{self.term_name} < 0', f'self.{self.term_name}')
+        elif self.__sum_negative is not None:
             self.other_methods_content.append('@classmethod')
-            self.other_methods_content.append(f'def before_grounding_init_negative_sum_{self.term_name}(cls): cls.sum_negative_of_{self.term_name} = 0')
+            self.other_methods_content.append(f'def before_grounding_init_negative_sum_{self.term_name}(cls, state): state.sum_negative_of_{self.term_name} = 0')
             self.other_methods_content.append('@classmethod')
-            self.other_methods_content.append(f'def after_grounding_check_negative_sum_{self.term_name}(cls):')
+            self.other_methods_content.append(f'def after_grounding_check_negative_sum_{self.term_name}(cls, state):')
             if 'max' in self.__sum_negative:
                 max_bound = self.__sum_negative['max']
-                self.other_methods_content.append(f'\tif cls.sum_negative_of_{self.term_name} > {max_bound}: raise ValueError(\'sum of {self.term_name} in predicate {self.predicate_name} cannot reach {max_bound}\')')
+                self.other_methods_content.append(f'\tif state.sum_negative_of_{self.term_name} > {max_bound}: raise ValueError(\'sum of {self.term_name} in predicate {self.predicate_name} cannot reach {max_bound}\')')
             if 'min' in self.__sum_negative:
                 min_bound = self.__sum_negative['min']
-                self.other_methods_content.append(f'\tif cls.sum_negative_of_{self.term_name} < {min_bound}: raise ValueError(\'sum of {self.term_name} in predicate {self.predicate_name} may exceed {min_bound}\')')
+                self.other_methods_content.append(f'\tif state.sum_negative_of_{self.term_name} < {min_bound}: raise ValueError(\'sum of {self.term_name} in predicate {self.predicate_name} may exceed {min_bound}\')')
             self.post_init_content.append(f'if self.{self.term_name} < 0:')
-            self.post_init_content.append(f'\tself.__class__.sum_negative_of_{self.term_name} += self.{self.term_name}')
+            self.post_init_content.append(f'\tself.valasp_state().sum_negative_of_{self.term_name} += self.{self.term_name}')
 
     def convert2python(self):
         if self.__min > INT_MIN:
@@ -269,9 +399,11 @@ class IntegerTerm(GenericTerm):
             message = ErrorMessages.raise_error(f'Should be <= {self.__max}', ['self.%s' % self.term_name])
             self.post_init_content.append(f'if self.{self.term_name} > {self.__max}: raise ValueError({message})')
         if self.__enum is not None:
-            s = set(self.__enum)
+            s = '{' + ', '.join(str(i) for i in dict.fromkeys(self.__enum)) + '}'
             message = ErrorMessages.raise_error(f'Should be one of {s}', ['self.%s' % self.term_name])
             self.post_init_content.append(f'if self.{self.term_name} not in {s}: raise ValueError({message})')
+        if self.__enum_file is not None:
+            self.post_init_content.append(_enum_file_check(self.term_name, self.term_type, self.__enum_file))
         GenericTerm.convert2python(self)
         self.__process_sums_positive()
         self.__process_sums_negative()
@@ -285,6 +417,7 @@ class StringAlphaTerm(GenericTerm):
         self.__max = INT_MAX
         self.__pattern = None
         self.__enum = None
+        self.__enum_file = None
         if isinstance(content, dict):
             self.__parse_content(content)
 
@@ -297,6 +430,8 @@ class StringAlphaTerm(GenericTerm):
             self.__pattern = content['pattern']
         if 'enum' in content:
             self.__enum = content['enum']
+        if 'enum_file' in content:
+            self.__enum_file = content['enum_file']
 
     def convert2python(self):
         if self.__min > 0:
@@ -306,7 +441,7 @@ class StringAlphaTerm(GenericTerm):
             message = ErrorMessages.raise_error(f'Len should be <= {self.__max}', ['self.%s' % self.term_name])
             self.post_init_content.append(f'if len(self.{self.term_name}) > {self.__max}: raise ValueError({message})')
         if self.__enum is not None:
-            s = set(self.__enum)
+            s = dict.fromkeys(self.__enum)
             s1 = "{"
             for i in s:
                 s1 += f'_({_encode(i)}),'
@@ -318,6 +453,8 @@ class StringAlphaTerm(GenericTerm):
             s2 = s2[:-1] + ""
             message = ErrorMessages.raise_error(f'Should be one of [{s2}]', ['self.%s' % self.term_name])
             self.post_init_content.append(f'if self.{self.term_name} not in {s1}: raise ValueError({message})')
+        if self.__enum_file is not None:
+            self.post_init_content.append(_enum_file_check(self.term_name, self.term_type, self.__enum_file))
 
         if self.__pattern is not None:
             message = ErrorMessages.raise_error(f'Not match regex {{_({_encode(self.__pattern)})}}', ['self.%s' % self.term_name])
@@ -335,6 +472,37 @@ class AlphaTerm(StringAlphaTerm):
         StringAlphaTerm.__init__(self, content, term_name, 'Alpha')
 
 
+class DateTerm(GenericTerm):
+
+    def __init__(self, content, term_name):
+        GenericTerm.__init__(self, content, term_name, 'Date')
+        self.__min = None
+        self.__max = None
+        if isinstance(content, dict):
+            self.__parse_content(content)
+
+    @staticmethod
+    def to_tuple(value):
+        if isinstance(value, datetime.date):
+            return value.year, value.month, value.day
+        return Date.parse(value)
+
+    def __parse_content(self, content):
+        if 'min' in content:
+            self.__min = self.to_tuple(content['min'])
+        if 'max' in content:
+            self.__max = self.to_tuple(content['max'])
+
+    def convert2python(self):
+        if self.__min is not None:
+            message = ErrorMessages.raise_error(f'Should be >= {self.__min}', ['self.%s' % self.term_name])
+            self.post_init_content.append(f'if self.{self.term_name} < {self.__min}: raise ValueError({message})')
+        if self.__max is not None:
+            message = ErrorMessages.raise_error(f'Should be <= {self.__max}', ['self.%s' % self.term_name])
+            self.post_init_content.append(f'if self.{self.term_name} > {self.__max}: raise ValueError({message})')
+        GenericTerm.convert2python(self)
+
+
 class UserDefinedTerm(GenericTerm):
 
     def __init__(self, content, term_name):
@@ -345,14 +513,20 @@ class UserDefinedTerm(GenericTerm):
 
 class Yaml2Python:
 
-    def __init__(self, content):
-        global all_symbols
+    def __init__(self, content, base_dir: str = '.'):
+        global all_symbols, all_references, all_enum_files, base_directory
         all_symbols = set()
+        all_references = {}
+        all_enum_files = set()
+        base_directory = base_dir
         self.__content = content
         self.__valasp_python = ""
         self.__valasp_asp = b''
         self.__valasp_wrap = []
+        self.__valasp_pure = []
         self.__valasp_max_arity = 16
+        self.__valasp_lazy = False
+        self.__valasp_output = False
         self.__symbols = []
         self.__output = []
 
@@ -363,15 +537,28 @@ class Yaml2Python:
             if 'asp' in self.__content['valasp']:
                 self.__valasp_asp = base64.b64encode(str(self.__content['valasp']['asp']).encode())
             if 'wrap' in self.__content['valasp']:
-                self.__valasp_wrap = self.__content['valasp']['wrap']
+                for item in self.__content['valasp']['wrap']:
+                    if isinstance(item, dict):
+                        self.__valasp_wrap.append(item['name'])
+                        if item.get('pure', False):
+                            self.__valasp_pure.append((item['name'], item.get('maxsize', 1024)))
+                    else:
+                        self.__valasp_wrap.append(item)
             if 'max_arity' in self.__content['valasp']:
                 self.__valasp_max_arity = self.__content['valasp']['max_arity']
+            if 'lazy' in self.__content['valasp']:
+                self.__valasp_lazy = self.__content['valasp']['lazy']
+            if 'output' in self.__content['valasp']:
+                self.__valasp_output = self.__content['valasp']['output']
 
     def __read_symbols(self):
         reserved_keywords = {'valasp'}
         for symbol_name in self.__content:
             if symbol_name not in reserved_keywords:
                 all_symbols.add(symbol_name)
+        for symbol_name in self.__content:
+            if symbol_name not in reserved_keywords:
+                self.__read_references(symbol_name)
         for symbol_name in self.__content:
             if symbol_name not in reserved_keywords:
                 symbol = Symbol(self.__content[symbol_name], symbol_name)
@@ -379,6 +566,43 @@ class Yaml2Python:
                 self.__output.extend(symbol.convert2python())
                 self.__output.append('')
 
+    @staticmethod
+    def __term_type(content):
+        return content['type'] if isinstance(content, dict) else content
+
+    def __read_references(self, symbol_name):
+        for term_name, term in self.__content[symbol_name].items():
+            if term_name == 'valasp' or not isinstance(term, dict) or 'references' not in term:
+                continue
+            predicate = term['references']['predicate']
+            key = term['references']['term']
+            if predicate not in all_symbols:
+                raise ValueError(f'{symbol_name}: {term_name}: references: {predicate} is not a symbol')
+            if not self.__content[predicate].get('valasp', {}).get('validate_predicate', True):
+                raise ValueError(f'{symbol_name}: {term_name}: references: {predicate} must be validated, but validate_predicate is False')
+            if key == 'valasp' or key not in self.__content[predicate]:
+                raise ValueError(f'{symbol_name}: {term_name}: references: {key} is not a term of {predicate}')
+            if self.__term_type(term) != self.__term_type(self.__content[predicate][key]):
+                raise ValueError(f'{symbol_name}: {term_name}: references: {key} of {predicate} has a different type')
+            all_references.setdefault(predicate, {})[key] = None
+
+    def __output_validator(self) -> str:
+        if self.__valasp_output is True:
+            return 'context.valasp_output_validator()'
+        if self.__valasp_output:
+            for predicate in self.__valasp_output:
+                if predicate not in all_symbols:
+                    raise ValueError(f'valasp: output: {predicate} is not a symbol')
+            return f'context.valasp_output_validator({self.__valasp_output})'
+        return 'None'
+
+    def enum_files(self) -> List[str]:
+        """Return the absolute paths of the files of enumerations read by the code produced by :meth:`convert2python`.
+
+        :return: a sorted list of paths
+        """
+        return sorted(all_enum_files)
+
     def convert2python(self) -> List[str]:
         YamlValidation.validate(self.__content)
         self.__read_valasp()
@@ -389,33 +613,69 @@ class Yaml2Python:
 
         all_import = """
 import clingo
+import collections
+import itertools
 import valasp
 import valasp.core
+import valasp.enums
+import valasp.graphs
+import valasp.readers
 import base64
+import os
 import re
 import sys
-from valasp.domain.primitive_types import Alpha, Any, Integer, String
+from valasp.domain.primitive_types import Alpha, Any, Date, Integer, String
 
 def _(x):
     return base64.b64decode(x).decode()
 """
+        build = [f'context.valasp_pure({name}, maxsize={maxsize})' for name, maxsize in self.__valasp_pure]
+        build.extend(self.__output)
+        if not build:
+            build.append('pass')
+
         template = f"""
-def main(files, with_solve=True, stdout=sys.stdout, stderr=sys.stderr):
-    try:
-        context = valasp.core.Context(wrap=[{', '.join(self.__valasp_wrap)}], max_arity={self.__valasp_max_arity})
+def valasp_build(context):
+    {f'{newline}    '.join(build)}
+
+
+valasp_template = None
 
-        {f'{newline}        '.join(self.__output)}
 
-        control = clingo.Control()
+def main(files, with_solve=True, stdout=sys.stdout, stderr=sys.stderr, models=None, quiet=False, control_args=None, tables=None,
+         snapshots=None, save_snapshot=None, snapshot_key=''):
+    global valasp_template
+    control = clingo.Control(control_args or [])
+    try:
+        if valasp_template is None:
+            valasp_template = valasp.core.ContextTemplate(valasp_build, wrap=[{', '.join(self.__valasp_wrap)}], max_arity={self.__valasp_max_arity}, lazy={self.__valasp_lazy})
+        context = valasp_template.instantiate()
+
+        if models is not None:
+            control.configuration.solve.models = models
         for file_ in files:
-            control.load(file_)
+            context.valasp_load(control, file_)
+        facts = {{}}
+        for predicate, filename in tables or []:
+            cls = context.valasp_class(predicate)
+            facts[cls] = itertools.chain(facts.get(cls, ()), valasp.readers.read_table(filename, list(cls.__annotations__)))
+
+        def on_validation_done():
+            if save_snapshot is not None:
+                context.valasp_save_snapshot(control, save_snapshot, snapshot_key)
+            print("ALL VALID!{slash_slash}n==========", file=stdout)
+
         try:
             context.valasp_run(
                 control, 
-                on_validation_done=lambda: print("ALL VALID!{slash_slash}n==========", file=stdout), 
-                on_model=lambda m: print(f"Answer: {{m}}{slash_slash}n==========", file=stdout), 
+                on_validation_done=on_validation_done,
+                on_model=None if quiet else lambda m: context.valasp_print_model(m, stdout, suffix="{slash_slash}n=========={slash_slash}n"), 
                 aux_program=[_({self.__valasp_asp})],
                 with_solve=with_solve,
+                output_validator={self.__output_validator()},
+                facts=facts,
+                snapshots=snapshots,
+                snapshot_key=snapshot_key,
             )
         except RuntimeError as e:
             raise ValueError(context.valasp_extract_error_message(e)) from None
@@ -426,4 +686,4 @@ def main(files, with_solve=True, stdout=sys.stdout, stderr=sys.stderr):
         print('=================', file=stdout)
 """
 
-        return [all_import, self.__valasp_python, template]
+        return [all_import, f"{BASE_DIRECTORY_ASSIGNMENT}_({_encode(os.path.abspath(base_directory))})\n", self.__valasp_python, template]
@@ -1,9 +1,11 @@
+import datetime
 import re
 
 from valasp.domain.names import PredicateName, AttributeName, ClassName
 from valasp.domain.primitive_types import Integer
 from valasp.domain.primitive_types import String
 from valasp.domain.primitive_types import Alpha
+from valasp.domain.primitive_types import Date
 
 
 class YamlValidation:
@@ -28,6 +30,15 @@ class YamlValidation:
         except (ValueError, TypeError) as v:
             raise ValueError('%s' % v)
 
+    @classmethod
+    def __validate_term_names(cls, content):
+        if not isinstance(content, list) or not content:
+            raise ValueError('expected non-empty list of term names')
+        for c in content:
+            cls.__validate_term_name(c)
+        if len(set(content)) != len(content):
+            raise ValueError('expected distinct term names')
+
     @classmethod
     def __validate_str(cls, content):
         try:
@@ -42,6 +53,17 @@ class YamlValidation:
         except (ValueError, TypeError) as v:
             raise ValueError('%s' % v)
 
+    @classmethod
+    def __validate_date(cls, content):
+        if isinstance(content, datetime.datetime):
+            raise ValueError('expected date, but found datetime %s' % content)
+        if isinstance(content, datetime.date):
+            return (content.year, content.month, content.day)
+        try:
+            return Date.parse(content)
+        except (ValueError, TypeError) as v:
+            raise ValueError('%s' % v)
+
     @classmethod
     def __validate_bool(cls, content):
         if not isinstance(content, bool):
@@ -87,6 +109,12 @@ class YamlValidation:
             except ValueError as v:
                 raise ValueError('invalid value in enum: %s' % v)
 
+    @classmethod
+    def __validate_enum_file(cls, content):
+        cls.__validate_str(content)
+        if not content:
+            raise ValueError('expected file name')
+
     @classmethod
     def __validate_pattern(cls, content):
         try:
@@ -113,11 +141,24 @@ class YamlValidation:
             if int(content['min']) > int(content['max']):
                 raise ValueError('min (%s) is expected to be less than or equal to max (%s)' % (content['min'], content['max']))
 
+    @classmethod
+    def validate_group_by(cls, content):
+        cls.__validate_term_names(content)
+
+    @classmethod
+    def __validate_aggregate_group_by(cls, content):
+        if 'group_by' in content:
+            try:
+                cls.validate_group_by(content['group_by'])
+            except ValueError as v:
+                raise ValueError('group_by: %s' % v)
+
     @classmethod
     def validate_aggregate_sum_pos(cls, content):
         if isinstance(content, dict):
-            keywords = {'min', 'max'}
+            keywords = {'min', 'max', 'group_by'}
             cls.__validate_keywords(keywords, content, 'sum+')
+            cls.__validate_aggregate_group_by(content)
             cls.__validate_min_max(content, True)
         elif content != 'Integer':
             raise ValueError('expected keyword Integer')
@@ -125,8 +166,9 @@ class YamlValidation:
     @classmethod
     def validate_aggregate_sum_neg(cls, content):
         if isinstance(content, dict):
-            keywords = {'min', 'max'}
+            keywords = {'min', 'max', 'group_by'}
             cls.__validate_keywords(keywords, content, 'sum-')
+            cls.__validate_aggregate_group_by(content)
             cls.__validate_min_max(content, False)
         elif content != 'Integer':
             raise ValueError('expected keyword Integer')
@@ -134,8 +176,9 @@ class YamlValidation:
     @classmethod
     def validate_aggregate_count(cls, content):
         if isinstance(content, dict):
-            keywords = {'min', 'max'}
+            keywords = {'min', 'max', 'group_by'}
             cls.__validate_keywords(keywords, content, 'count')
+            cls.__validate_aggregate_group_by(content)
             cls.__validate_min_max(content, True)
         elif isinstance(content, int):
             if content < 0:
@@ -143,9 +186,21 @@ class YamlValidation:
         else:
             raise ValueError(f'expecting dictionary or integer for count, found {type(content)}')
 
+    @classmethod
+    def validate_references(cls, content):
+        if not isinstance(content, dict):
+            raise ValueError('expected structure with keywords predicate and term')
+        keywords = {'predicate', 'term'}
+        cls.__validate_keywords(keywords, content, 'references')
+        for r in keywords:
+            if r not in content:
+                raise ValueError('expected keyword %s' % r)
+        cls.__validate_predicate_name(content['predicate'])
+        cls.__validate_term_name(content['term'])
+
     @classmethod
     def validate_complex_term_int(cls, content):
-        keywords = {'type', 'min', 'max', 'sum+', 'sum-', 'count', 'enum'}
+        keywords = {'type', 'min', 'max', 'sum+', 'sum-', 'count', 'enum', 'enum_file', 'references'}
         cls.__validate_keywords(keywords, content, 'Integer type')
         for c in content:
             try:
@@ -157,15 +212,19 @@ class YamlValidation:
                     cls.validate_aggregate_sum_neg(content[c])
                 elif c == 'count':
                     cls.validate_aggregate_count(content[c])
+                elif c == 'references':
+                    cls.validate_references(content[c])
                 elif c == 'enum':
                     cls.__validate_enum(content[c], 'Integer')
+                elif c == 'enum_file':
+                    cls.__validate_enum_file(content[c])
             except ValueError as v:
                 raise ValueError('%s: %s' % (c, v))
         cls.__validate_min_less_than_or_equal_to_max(content)
 
     @classmethod
     def validate_complex_term_string(cls, content):
-        keywords = {'type', 'min', 'max', 'pattern', 'count', 'enum'}
+        keywords = {'type', 'min', 'max', 'pattern', 'count', 'enum', 'enum_file', 'references'}
         cls.__validate_keywords(keywords, content, 'String type')
         for c in content:
             try:
@@ -173,8 +232,12 @@ class YamlValidation:
                     cls.__validate_positive_int(content[c])
                 elif c == 'count':
                     cls.validate_aggregate_count(content[c])
+                elif c == 'references':
+                    cls.validate_references(content[c])
                 elif c == 'enum':
                     cls.__validate_enum(content[c], 'String')
+                elif c == 'enum_file':
+                    cls.__validate_enum_file(content[c])
                 elif c == 'pattern':
                     cls.__validate_pattern(content[c])
             except ValueError as v:
@@ -183,7 +246,7 @@ class YamlValidation:
 
     @classmethod
     def validate_complex_term_alpha(cls, content):
-        keywords = {'type', 'min', 'max', 'pattern', 'count', 'enum'}
+        keywords = {'type', 'min', 'max', 'pattern', 'count', 'enum', 'enum_file', 'references'}
         cls.__validate_keywords(keywords, content, 'Alpha type')
         for c in content:
             try:
@@ -191,39 +254,65 @@ class YamlValidation:
                     cls.__validate_positive_int(content[c])
                 elif c == 'count':
                     cls.validate_aggregate_count(content[c])
+                elif c == 'references':
+                    cls.validate_references(content[c])
                 elif c == 'enum':
                     cls.__validate_enum(content[c], 'Alpha')
+                elif c == 'enum_file':
+                    cls.__validate_enum_file(content[c])
                 elif c == 'pattern':
                     cls.__validate_pattern(content[c])
             except ValueError as v:
                 raise ValueError('%s: %s' % (c, v))
         cls.__validate_min_less_than_or_equal_to_max(content)
 
+    @classmethod
+    def validate_complex_term_date(cls, content):
+        keywords = {'type', 'min', 'max', 'count', 'references'}
+        cls.__validate_keywords(keywords, content, 'Date type')
+        bounds = {}
+        for c in content:
+            try:
+                if c == 'min' or c == 'max':
+                    bounds[c] = cls.__validate_date(content[c])
+                elif c == 'count':
+                    cls.validate_aggregate_count(content[c])
+                elif c == 'references':
+                    cls.validate_references(content[c])
+            except ValueError as v:
+                raise ValueError('%s: %s' % (c, v))
+        if 'min' in bounds and 'max' in bounds and bounds['min'] > bounds['max']:
+            raise ValueError('min (%s) is expected to be less than or equal to max (%s)' % (content['min'], content['max']))
+
     @classmethod
     def validate_complex_term_any(cls, content):
-        keywords = {'type', 'count'}
+        keywords = {'type', 'count', 'references'}
         cls.__validate_keywords(keywords, content, 'Any type')
         for c in content:
             try:
                 if c == 'count':
                     cls.validate_aggregate_count(content[c])
+                elif c == 'references':
+                    cls.validate_references(content[c])
             except ValueError as v:
                 raise ValueError('%s: %s' % (c, v))
 
     @classmethod
     def validate_complex_term_user_defined(cls, content):
-        keywords = {'type', 'count'}
+        keywords = {'type', 'count', 'references'}
         cls.__validate_keywords(keywords, content, 'user defined symbol')
         for c in content:
             try:
                 if c == 'count':
                     cls.validate_aggregate_count(content[c])
+                elif c == 'references':
+                    cls.validate_references(content[c])
             except ValueError as v:
                 raise ValueError('%s: %s' % (c, v))
 
     @classmethod
     def validate_term_type(cls, content):
-        keywords = {'Alpha', 'Any', 'Integer', 'String'}
+        keywords = {'Alpha', 'Any', 'Date', 'Integer', 'String'}
         cls.__validate_str(content)
         if content not in keywords:
             try:
@@ -238,6 +327,8 @@ class YamlValidation:
             for r in required:
                 if r not in content:
                     raise ValueError('expected keyword %s' % r)
+            if 'enum' in content and 'enum_file' in content:
+                raise ValueError('expected at most one of enum and enum_file')
             try:
                 type_ = content['type']
                 cls.validate_term_type(type_)
@@ -247,6 +338,8 @@ class YamlValidation:
                     cls.validate_complex_term_string(content)
                 elif type_ == 'Alpha':
                     cls.validate_complex_term_alpha(content)
+                elif type_ == 'Date':
+                    cls.validate_complex_term_date(content)
                 elif type_ == 'Any':
                     cls.validate_complex_term_any(content)
                 else:
@@ -283,10 +376,32 @@ class YamlValidation:
             if not cls.__is_predicate_name(m['second']):
                 raise ValueError('expected predicate or class name')
 
+    @classmethod
+    def validate_unique(cls, content):
+        cls.__validate_term_names(content)
+
+    @classmethod
+    def validate_graph(cls, content):
+        if not isinstance(content, dict):
+            raise ValueError('expected structure with keywords from and to')
+        keywords = {'from', 'to', 'acyclic', 'connected'}
+        cls.__validate_keywords(keywords, content, 'graph')
+        for r in ('from', 'to'):
+            if r not in content:
+                raise ValueError('expected keyword %s' % r)
+        for c in content:
+            try:
+                if c == 'from' or c == 'to':
+                    cls.__validate_term_name(content[c])
+                else:
+                    cls.__validate_bool(content[c])
+            except ValueError as v:
+                raise ValueError('%s: %s' % (c, v))
+
     @classmethod
     def validate_valasp_in_symbol(cls, content):
-        keywords = {'having', 'validate_predicate', 'with_fun', 'auto_blacklist', 'after_init', 'before_grounding',
-                    'after_grounding'}
+        keywords = {'having', 'validate_predicate', 'with_fun', 'auto_blacklist', 'unique', 'graph', 'nil',
+                    'after_init', 'before_grounding', 'after_grounding'}
         cls.__validate_keywords(keywords, content, 'valasp of symbol')
         for c in content:
             try:
@@ -298,6 +413,12 @@ class YamlValidation:
                     cls.validate_with_fun(content[c])
                 if c == 'auto_blacklist':
                     cls.__validate_bool(content[c])
+                if c == 'unique':
+                    cls.validate_unique(content[c])
+                if c == 'graph':
+                    cls.validate_graph(content[c])
+                if c == 'nil':
+                    cls.__validate_alpha(content[c])
                 if c == 'after_init':
                     cls.__validate_str(content[c])
                 if c == 'before_grounding':
@@ -351,17 +472,48 @@ class YamlValidation:
         except (ValueError, TypeError):
             return False
 
+    @classmethod
+    def validate_wrap_item(cls, content):
+        keywords = {'name', 'pure', 'maxsize'}
+        cls.__validate_keywords(keywords, content, 'wrap')
+        if 'name' not in content:
+            raise ValueError('expected keyword name')
+        if not cls.__is_predicate_name(content['name']):
+            raise ValueError('expected predicate name for pure @-term')
+        for c in content:
+            try:
+                if c == 'pure':
+                    cls.__validate_bool(content[c])
+                elif c == 'maxsize':
+                    cls.__validate_positive_int(content[c])
+                    if int(content[c]) == 0:
+                        raise ValueError('expected positive int')
+            except ValueError as v:
+                raise ValueError('%s: %s' % (c, v))
+
     @classmethod
     def validate_wrap(cls, content):
         if not isinstance(content, list):
             raise ValueError('expected a list')
         for c in content:
-            if not(cls.__is_predicate_name(c)) and not(cls.__is_class_name(c)):
+            if isinstance(c, dict):
+                cls.validate_wrap_item(c)
+            elif not(cls.__is_predicate_name(c)) and not(cls.__is_class_name(c)):
                 raise ValueError('expected predicate or class name')
 
+    @classmethod
+    def validate_output(cls, content):
+        if isinstance(content, bool):
+            return
+        if not isinstance(content, list):
+            raise ValueError('expected True, False or a list of predicate names')
+        for c in content:
+            if not cls.__is_predicate_name(c):
+                raise ValueError('expected predicate name')
+
     @classmethod
     def validate_valasp(cls, content):
-        keywords = {'python', 'asp', 'wrap', 'max_arity'}
+        keywords = {'python', 'asp', 'wrap', 'max_arity', 'lazy', 'output'}
         cls.__validate_keywords(keywords, content, 'valasp')
         for c in content:
             try:
@@ -371,6 +523,10 @@ class YamlValidation:
                     cls.validate_asp(content[c])
                 elif c == 'wrap':
                     cls.validate_wrap(content[c])
+                elif c == 'lazy':
+                    cls.__validate_bool(content[c])
+                elif c == 'output':
+                    cls.validate_output(content[c])
                 else:
                     assert c == 'max_arity'
                     cls.__validate_positive_int(content[c])